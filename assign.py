@@ -1,3 +1,8 @@
+import contextlib
+import copy
+import csv
+import itertools
+import json
 import random
 import time
 import mip
@@ -5,58 +10,241 @@ import pandas as pd
 import numpy as np
 import os
 import re
+import easychair
+import report
+import test_assignment
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from score_store import ScoreStore, find_score_filepath
+from flow import solve_flow, flow_available
+from heuristic import heuristic_assignment
+from candidates import candidate_mask, mask_to_pairs, pairs_to_mask, count_nonzeros, COI_THRESHOLD
+from country import country_coi_pairs, country_coi_sets
+from decompose import topic_clusters, cluster_affinity, split_capacity
 
 TIME_LIMIT = 60 * 60
 BID_SCORE = 1000
+REPAIR_TOP_K = 5
+# the options a scenario of --sweep is usually about
+SWEEP_PARAMS = ["assign_num", "default_min", "default_max", "country_coi_max", "max_no_bid"]
 
 def model(paper_ids, reviewer_ids, assignments, scores, min_max,
           country_coi, country_pcs,
-          assign_num, country_coi_max, max_no_bid_str):
-    m = mip.Model(name='paper_assignment')
-
-    # vars
+          assign_num, country_coi_max, no_bid_limits, lazy_country=False,
+          keep_pairs=(), keep_bonus=0, max_changes=None, partial=False, m=None, prefix=""):
+    # with m given, the vars and constraints of this pool are added to that model
+    # (see solve_joint); prefix keeps their names apart
+    shared = m is not None
+    if not shared:
+        m = mip.Model(name='paper_assignment')
+
+    # vars, indexed by paper and by reviewer so that every constraint visits only its own vars
     assignment_vars = {}
+    paper_vars = defaultdict(list)
+    paper_coi_vars = defaultdict(list)
+    reviewer_vars = defaultdict(list)
     for a in assignments:
-        assignment_vars[a] = m.add_var(name=f"Var_a({a})", var_type=mip.BINARY)
+        r, p = a
+        var = m.add_var(name=f"{prefix}Var_a({a})", var_type=mip.BINARY)
+        assignment_vars[a] = var
+        paper_vars[p].append(var)
+        if r in country_coi[p]:
+            paper_coi_vars[p].append(var)
+        reviewer_vars[r].append((p, var))
 
     # objective
-    m.objective = mip.maximize(mip.xsum((scores[r][p]) * assignment_vars[(r, p)]
-                                        for r, p in assignment_vars))
+    rids, pids = zip(*assignment_vars)
+    var_scores = scores.lookup(rids, pids)
+    if keep_bonus:
+        keep_set = set(keep_pairs)
+        var_scores += keep_bonus * np.array([a in keep_set for a in assignment_vars], dtype=np.int64)
+    objective = mip.xsum(int(s) * v for s, v in zip(var_scores, assignment_vars.values()))
+    m.objective = mip.maximize(m.objective + objective if shared else objective)
 
     # consts
     for p in paper_ids:
+        # a partial assignment (a subproblem of --clusters) may leave papers short
+        paper_sum = mip.xsum(paper_vars[p])
         m.add_constr(
-                mip.xsum(assignment_vars[(r, p)] for r in reviewer_ids) == assign_num,
-                name=f"Con_Paper({p})")
-        m.add_constr(
-                mip.xsum(assignment_vars[(r, p)] for r in reviewer_ids 
-                         if r in country_coi[p]) <= country_coi_max,
-                name=f"Con_Country({p})")
+                paper_sum <= assign_num if partial else paper_sum == assign_num,
+                name=f"{prefix}Con_Paper({p})")
+        if not lazy_country:
+            add_country_constr(m, p, paper_coi_vars[p], country_coi_max, prefix)
 
     for r in reviewer_ids:
         min_num, max_num = min_max[r]
         m.add_constr(
-                mip.xsum(assignment_vars[(r, p)] for p in paper_ids) <= max_num,
-                name=f"Con_Max({r})")
+                mip.xsum(var for p, var in reviewer_vars[r]) <= max_num,
+                name=f"{prefix}Con_Max({r})")
+        m.add_constr(
+                mip.xsum(var for p, var in reviewer_vars[r]) >= min_num,
+                name=f"{prefix}Con_MIN({r})")
+
+    for r, max_no_bid in no_bid_limits.items():
+        bid_papers = scores.papers_at_least(r, BID_SCORE)
+        m.add_constr(
+                mip.xsum(var for p, var in reviewer_vars[r]
+                         if p not in bid_papers) <= max_no_bid,
+                name=f"{prefix}Con_Max_No_Bid({r})")
+
+    if max_changes is not None:
         m.add_constr(
-                mip.xsum(assignment_vars[(r, p)] for p in paper_ids) >= min_num,
-                name=f"Con_MIN({r})")
-
-    if max_no_bid_str:
-        max_no_bid_settings = read_max_no_bid_str(max_no_bid_str)
-        for r in reviewer_ids:
-            bid_num = len([scores[r][p] for p in scores[r] if scores[r][p] >= BID_SCORE])
-            for setting in max_no_bid_settings:
-                min_bid, max_no_bid = setting["min_bid"], setting["max_no_bid"]
-                if bid_num >= min_bid:
-                    m.add_constr(
-                            mip.xsum(assignment_vars[(r, p)] for p in paper_ids
-                                    if scores[r][p] < BID_SCORE) <= max_no_bid,
-                            name=f"Con_Max_No_Bid({r})")
-                    break
-    
-    return m
+                mip.xsum(assignment_vars[a] for a in keep_pairs if a in assignment_vars)
+                >= len(keep_pairs) - max_changes,
+                name=f"{prefix}Con_Changes")
+
+    return m, assignment_vars
+
+
+def add_country_constr(m, p, coi_vars, country_coi_max, prefix=""):
+    m.add_constr(
+            mip.xsum(coi_vars) <= country_coi_max,
+            name=f"{prefix}Con_Country({p})")
+
+
+def find_country_violations(rids, pids, country_coi, country_coi_max):
+    coi_nums = defaultdict(int)
+    for r, p in zip(rids.tolist(), pids.tolist()):
+        if r in country_coi[p]:
+            coi_nums[p] += 1
+    return [p for p, num in coi_nums.items() if num > country_coi_max]
+
+
+def optimize_lazy_country(m, assignment_vars, country_coi, country_coi_max, start_pairs):
+    # cutting-plane loop: solve without the country constraints, then add only those of
+    # the papers whose assigned reviewers violate them and re-solve from the last solution
+    start = time.time()
+    rounds = added = 0
+    while True:
+        rounds += 1
+        remaining = TIME_LIMIT - (time.time() - start)
+        status = m.optimize(max_seconds=max(remaining, 1))
+        rids, pids = extract_assignments(assignment_vars)
+        if status not in (mip.OptimizationStatus.OPTIMAL, mip.OptimizationStatus.FEASIBLE):
+            break
+        violated = find_country_violations(rids, pids, country_coi, country_coi_max)
+        if not violated:
+            break
+        if time.time() - start >= TIME_LIMIT:
+            print(f"Warning: {len(violated)} papers still violate --country_coi_max")
+            status = mip.OptimizationStatus.NO_SOLUTION_FOUND
+            break
+        for p in violated:
+            coi_vars = [assignment_vars[(r, p)] for r in country_coi[p]
+                        if (r, p) in assignment_vars]
+            add_country_constr(m, p, coi_vars, country_coi_max)
+        added += len(violated)
+        # the heuristic start satisfies every country constraint; the last solution violates
+        # the ones just added, so CBC could not use it
+        if start_pairs is not None:
+            m.start = [(assignment_vars[(r, p)], 1.0) for r, p in start_pairs
+                       if (r, p) in assignment_vars]
+    print(f"Lazy country constraints: {rounds} rounds, {added} constraints added")
+    return status, rids, pids
+
+
+def extract_assignments(assignment_vars):
+    # one pass over the solution values
+    with report.phase("extraction"):
+        keys = np.array(list(assignment_vars), dtype=np.int64).reshape(-1, 2)
+        # var.x asks the solver each time
+        values = [var.x for var in assignment_vars.values()]
+        x = np.array([0.0 if value is None else value for value in values], dtype=np.float64)
+        rids, pids = keys[x > 0.5].T
+    return rids, pids
+
+
+def sort_assignments(rids, pids, reviewer_ids, paper_ids):
+    # ordered by reviewer, then by paper
+    order = np.lexsort((pd.Index(paper_ids).get_indexer(pids),
+                        pd.Index(reviewer_ids).get_indexer(rids)))
+    return rids[order], pids[order]
+
+
+def run_heuristic(score_matrix, mask, coi_mask, bid_mask, reviewer_ids, paper_ids, min_max,
+                  assign_num, country_coi_max, no_bid_limits, time_limit, initial_mask=None):
+    start = time.time()
+    mins = [min_max[r][0] for r in reviewer_ids]
+    maxs = [min_max[r][1] for r in reviewer_ids]
+    no_bid_caps = [no_bid_limits.get(r, len(paper_ids)) for r in reviewer_ids]
+    initial_pairs = None if initial_mask is None else list(zip(*np.nonzero(initial_mask)))
+    with report.phase("heuristic"):
+        state = heuristic_assignment(score_matrix, mask, coi_mask, bid_mask, mins, maxs,
+                                     no_bid_caps, assign_num, country_coi_max, time_limit,
+                                     initial_pairs)
+    print(f"Heuristic time: {time.time() - start:.1f}s")
+    pairs = np.array(state.pairs(), dtype=np.int64).reshape(-1, 2)
+    rids = np.asarray(reviewer_ids, dtype=np.int64)[pairs[:, 0]]
+    pids = np.asarray(paper_ids, dtype=np.int64)[pairs[:, 1]]
+    if state.is_complete():
+        return mip.OptimizationStatus.FEASIBLE, state.objective, rids, pids
+    print("Warning: the heuristic could not satisfy every paper and lower bound")
+    return mip.OptimizationStatus.NO_SOLUTION_FOUND, state.objective, rids, pids
+
+
+def solve(solver, paper_ids, reviewer_ids, assignments, scores, min_max,
+          country_coi, country_pcs, assign_num, country_coi_max, no_bid_limits, start_pairs=None,
+          lazy_country=False, keep_pairs=(), keep_bonus=0, max_changes=None, threads=-1,
+          verbose=True, partial=False, max_gap=None):
+    if solver == "flow":
+        start = time.time()
+        with report.phase("flow solve"):
+            pair_scores = scores.lookup(*zip(*assignments))
+            if keep_bonus:
+                keep_set = set(keep_pairs)
+                pair_scores += keep_bonus * np.array([a in keep_set for a in assignments],
+                                                     dtype=np.int64)
+            status, obj_val, rids, pids = solve_flow(assignments, pair_scores, reviewer_ids,
+                                                     paper_ids, min_max, assign_num)
+        print(f"Flow solve time: {time.time() - start:.1f}s")
+        return status, obj_val, rids, pids
+
+    start = time.time()
+    with report.phase("model build"):
+        m, assignment_vars = model(paper_ids, reviewer_ids, assignments, scores,
+                                   min_max, country_coi, country_pcs,
+                                   assign_num, country_coi_max, no_bid_limits, lazy_country,
+                                   keep_pairs, keep_bonus, max_changes, partial)
+    print(f"Model build time: {time.time() - start:.1f}s")
+    report.record_model("partial" if partial else "full", m)
+
+    if start_pairs is not None:
+        m.start = [(assignment_vars[(r, p)], 1.0) for r, p in start_pairs
+                   if (r, p) in assignment_vars]
+
+    m.threads = threads
+    m.verbose = int(verbose)
+    m.store_search_progress_log = True
+    if max_gap is not None:
+        # stop as soon as the incumbent is within max_gap of the bound
+        m.max_mip_gap = max_gap
+    start = time.time()
+    with report.phase("solve"):
+        if lazy_country:
+            status, rids, pids = optimize_lazy_country(m, assignment_vars, country_coi,
+                                                       country_coi_max, start_pairs)
+        else:
+            status = m.optimize(max_seconds=TIME_LIMIT)
+            rids, pids = extract_assignments(assignment_vars)
+    print(f"Solve time: {time.time() - start:.1f}s")
+    report.record_progress("partial" if partial else "full", m, time.time() - start)
+    return status, m.objective_value, rids, pids
+
+
+def pair_score(scores, rids, pids):
+    # the objective without any bonus: the sum of the scores of the pairs
+    return int(scores.lookup(rids, pids).sum())
+
+
+def write_assignments(output_filepath, rids, pids):
+    with open(output_filepath, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerows(zip(rids.tolist(), pids.tolist()))
+
+
+def read_previous_assignment(filepath):
+    df = pd.read_csv(filepath, header=None)
+    return list(zip(df[0].astype(int).tolist(), df[1].astype(int).tolist()))
 
 
 def read_max_no_bid_str(s):
@@ -69,13 +257,30 @@ def read_max_no_bid_str(s):
     return settings
 
 
-def read_reviewers(pc_filepath, reviewer_filepath):
-    pc_df = pd.read_excel(pc_filepath, engine='openpyxl')
-    rev_df = pd.read_csv(reviewer_filepath, header=None)
-    rev_df.columns = ["id", "name", "email", "role"]
+def get_no_bid_limits(reviewer_ids, scores, max_no_bid_str):
+    # reviewer id -> maximum number of non-bid papers, for reviewers who bid enough
+    no_bid_limits = {}
+    if not max_no_bid_str:
+        return no_bid_limits
+    max_no_bid_settings = read_max_no_bid_str(max_no_bid_str)
+    bid_nums = scores.count_at_least(BID_SCORE)
+    for r in reviewer_ids:
+        bid_num = bid_nums.get(r, 0)
+        for setting in max_no_bid_settings:
+            min_bid, max_no_bid = setting["min_bid"], setting["max_no_bid"]
+            if bid_num >= min_bid:
+                no_bid_limits[r] = max_no_bid
+                break
+    return no_bid_limits
+
+
+def no_bid_mask(score_matrix, reviewer_ids, no_bid_limits):
+    limited = np.array([r in no_bid_limits for r in reviewer_ids], dtype=bool)
+    return limited[:, None] & (score_matrix < BID_SCORE)
+
 
-    pc_df = pd.merge(pc_df, rev_df, on="email")
-    return pc_df
+def read_reviewers(pc_filepath, input_dirpath):
+    return easychair.read_pc_members(pc_filepath, input_dirpath)
 
 def get_max_num(pc_df, default_max):
     max_nums = {}
@@ -84,51 +289,593 @@ def get_max_num(pc_df, default_max):
         max_nums[rid] = default_max if np.isnan(max_num) else max_num
     return max_nums
 
+def get_min_max(inputs, args):
+    max_nums = get_max_num(inputs["pc_df"], args.default_max)
+
+    min_max = {}
+    for r in inputs["reviewer_ids"]:
+        max_num = max_nums[r]
+        min_num = min([args.default_min, max_num])
+        min_max[r] = (min_num, max_num)
+    return min_max
+
 def read_scores(score_filepath):
-    scores = defaultdict(lambda: defaultdict(int))
-    score_df = pd.read_excel(score_filepath, engine='openpyxl')
-    for idx, (rid, pid, score) in score_df.iterrows():
-        rid, pid, score = int(rid), int(pid), int(score)
-        scores[rid][pid] = score
-    return scores
-
-def find_country_coi(input_dirpath):
-    easychair_filepath = os.path.join(input_dirpath, "easychair.xlsx")
-    pc_df = pd.read_excel(easychair_filepath, "Program committee", engine='openpyxl')
-    author_df = pd.read_excel(easychair_filepath, "Authors", engine='openpyxl')
-
-    paper_countries = defaultdict(set)
-    for idx, (pid, country) in author_df[["submission #", "country"]].iterrows():
-        paper_countries[pid].add(country)
-
-    rev_filepath = os.path.join(input_dirpath, "reviewer.csv")
-    rev_df = pd.read_csv(rev_filepath, header=None)
-    rev_df.columns = ["id", "name", "email", "role"]
-    pc_df = pd.merge(pc_df, rev_df, on="email")
-
-    country_coi = defaultdict(set)
-    for idx, (rid, country) in pc_df[["id", "country"]].iterrows():
-        for pid, country_set in paper_countries.items():
-            if country in country_set:
-                country_coi[pid].add(rid)
-    return country_coi
+    return ScoreStore.load(score_filepath)
 
+def find_country_coi_pairs(input_dirpath):
+    return country_coi_pairs(easychair.read_pc_countries(input_dirpath),
+                             easychair.read_authors(input_dirpath))
 
-def find_country_pcs(input_dirpath):
-    easychair_filepath = os.path.join(input_dirpath, "easychair.xlsx")
-    pc_df = pd.read_excel(easychair_filepath, "Program committee", engine='openpyxl')
 
-    rev_filepath = os.path.join(input_dirpath, "reviewer.csv")
-    rev_df = pd.read_csv(rev_filepath, header=None)
-    rev_df.columns = ["id", "name", "email", "role"]
-    pc_df = pd.merge(pc_df, rev_df, on="email")
+def find_country_pcs(input_dirpath):
+    pc_df = easychair.read_pc_countries(input_dirpath)
 
     country_pcs = defaultdict(set)
-    for idx, (rid, country) in pc_df[["id", "country"]].iterrows():
-        country_pcs[country].add(rid)
+    for country, rids in pc_df.groupby("country")["id"]:
+        country_pcs[country] = set(rids.tolist())
     return country_pcs
 
 
+def load_shared_inputs(input_dirpath):
+    # everything the pools of reviewers (e.g., PCs and SPCs) share, loaded once per run
+    with report.phase("loading"):
+        paper_df = easychair.read_submissions(input_dirpath)
+        paper_ids = paper_df["#"].astype(int).tolist()
+        score_filepath = find_score_filepath(input_dirpath)
+        print("Scores:", score_filepath)
+        scores = read_scores(score_filepath)
+        coi_rids, coi_pids = find_country_coi_pairs(input_dirpath)
+        country_pcs = find_country_pcs(input_dirpath)
+
+    with report.phase("score build"):
+        country_coi = country_coi_sets(coi_rids, coi_pids)
+    return {
+        "paper_ids": paper_ids,
+        "scores": scores,
+        "coi_rids": coi_rids,
+        "coi_pids": coi_pids,
+        "country_coi": country_coi,
+        "country_pcs": country_pcs,
+    }
+
+
+def load_pool_inputs(shared, pc_filepath, input_dirpath):
+    # everything that does not depend on the assignment parameters, for one PC list
+    paper_ids = shared["paper_ids"]
+    with report.phase("loading"):
+        pc_df = read_reviewers(pc_filepath, input_dirpath)
+        reviewer_ids = pc_df["id"].astype(int).tolist()
+
+    with report.phase("score build"):
+        score_matrix = shared["scores"].dense(reviewer_ids, paper_ids)
+        coi_mask = pairs_to_mask(shared["coi_rids"], shared["coi_pids"], reviewer_ids, paper_ids)
+    inputs = dict(shared)
+    inputs.update({
+        "pc_df": pc_df,
+        "reviewer_ids": reviewer_ids,
+        "score_matrix": score_matrix,
+        "coi_mask": coi_mask,
+    })
+    return inputs
+
+
+def load_inputs(pc_filepath, input_dirpath):
+    return load_pool_inputs(load_shared_inputs(input_dirpath), pc_filepath, input_dirpath)
+
+
+_worker_inputs = None
+
+
+def init_worker(inputs):
+    # the inputs are handed to every worker process once, not with each task
+    global _worker_inputs
+    _worker_inputs = inputs
+
+
+def solve_cluster(paper_ids, reviewer_ids, assignments, min_max, assign_num, country_coi_max,
+                  no_bid_limits, threads, max_gap=None):
+    if not assignments:
+        return mip.OptimizationStatus.OPTIMAL, 0, np.zeros(0, np.int64), np.zeros(0, np.int64)
+    inputs = _worker_inputs
+    return solve("mip", paper_ids, reviewer_ids, assignments, inputs["scores"], min_max,
+                 inputs["country_coi"], inputs["country_pcs"], assign_num, country_coi_max,
+                 no_bid_limits, threads=threads, verbose=False, partial=True, max_gap=max_gap)
+
+
+def solve_decomposed(inputs, paper_topic_df, mask, min_max, assign_num, country_coi_max,
+                     no_bid_limits, n_clusters, jobs, threads=-1, verbose=True, lazy_country=False,
+                     keep_mask=None, keep_pairs=(), keep_bonus=0, max_changes=None, max_gap=None):
+    # Papers are split into topic clusters and every reviewer's capacity (and no-bid limit)
+    # over the clusters in proportion to their scores there. Each cluster is solved on its
+    # own without lower bounds, then one MIP over the cluster solution plus the pairs of the
+    # papers and reviewers it left short repairs the full constraints.
+    paper_ids, reviewer_ids = inputs["paper_ids"], inputs["reviewer_ids"]
+    score_matrix = inputs["score_matrix"]
+    cpus = os.cpu_count() or 1
+    jobs = max(1, min(jobs or cpus, n_clusters))
+    sub_threads = max(1, (threads if threads > 0 else cpus) // jobs)
+
+    start = time.time()
+    labels = topic_clusters(paper_topic_df, paper_ids, n_clusters)
+    affinity = cluster_affinity(score_matrix, labels, n_clusters)
+    caps = split_capacity(affinity, [min_max[r][1] for r in reviewer_ids])
+    no_bid_caps = split_capacity(affinity, [no_bid_limits.get(r, 0) for r in reviewer_ids])
+    print("Clusters (papers):", np.bincount(labels, minlength=n_clusters).tolist())
+
+    subproblems = []
+    for c in range(n_clusters):
+        rows, cols = np.flatnonzero(caps[:, c] > 0), np.flatnonzero(labels == c)
+        sub_reviewer_ids = [reviewer_ids[i] for i in rows]
+        sub_paper_ids = [paper_ids[j] for j in cols]
+        # pairs without a positive score add nothing; the repair can still use them
+        sub_mask = mask[np.ix_(rows, cols)] & (score_matrix[np.ix_(rows, cols)] > 0)
+        subproblems.append((
+            sub_paper_ids, sub_reviewer_ids,
+            mask_to_pairs(sub_mask, sub_reviewer_ids, sub_paper_ids),
+            {reviewer_ids[i]: (0, int(caps[i, c])) for i in rows},
+            assign_num, country_coi_max,
+            {reviewer_ids[i]: int(no_bid_caps[i, c]) for i in rows if reviewer_ids[i] in no_bid_limits},
+            sub_threads, max_gap))
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                 initargs=(inputs,)) as executor:
+            results = list(executor.map(solve_cluster, *zip(*subproblems)))
+    else:
+        init_worker(inputs)
+        results = [solve_cluster(*subproblem) for subproblem in subproblems]
+    rids = np.concatenate([result[2] for result in results])
+    pids = np.concatenate([result[3] for result in results])
+    print(f"Cluster subproblems: {len(rids)} / {assign_num * len(paper_ids)} slots filled, "
+          f"objective {sum(result[1] or 0 for result in results):.0f} "
+          f"({jobs} jobs, {time.time() - start:.1f}s)")
+
+    start_mask = pairs_to_mask(rids, pids, reviewer_ids, paper_ids)
+    short_papers = start_mask.sum(axis=0) < assign_num
+    short_reviewers = start_mask.sum(axis=1) < np.array([min_max[r][0] for r in reviewer_ids])
+    repair_mask = start_mask | (mask & short_papers[None, :]) | (mask & short_reviewers[:, None])
+    # each paper's best reviewers let the repair move pairs across the cluster boundaries
+    repair_mask |= mask & candidate_mask(score_matrix, top_k=REPAIR_TOP_K * assign_num)
+    if keep_mask is not None:
+        repair_mask |= keep_mask
+    # the previous pairs, which the clusters know nothing about, are the better start
+    start_pairs = list(keep_pairs) or list(zip(rids.tolist(), pids.tolist()))
+    for repair_mask in [repair_mask, mask]:
+        print(f"Repair: {short_papers.sum()} papers and {short_reviewers.sum()} reviewers short, "
+              f"{repair_mask.sum()} variables")
+        status, obj_val, rids, pids = solve("mip", paper_ids, reviewer_ids,
+                                            mask_to_pairs(repair_mask, reviewer_ids, paper_ids),
+                                            inputs["scores"], min_max, inputs["country_coi"],
+                                            inputs["country_pcs"], assign_num, country_coi_max,
+                                            no_bid_limits, start_pairs, lazy_country, keep_pairs,
+                                            keep_bonus, max_changes, threads, verbose,
+                                            max_gap=max_gap)
+        if status != mip.OptimizationStatus.INFEASIBLE:
+            break
+        print("Infeasible around the cluster solution. Retrying with all candidates")
+    return status, obj_val, rids, pids
+
+
+def assign(inputs, args, threads=-1, verbose=True):
+    # solves one scenario; args holds the assignment options of the command line
+    paper_ids, reviewer_ids = inputs["paper_ids"], inputs["reviewer_ids"]
+    scores, score_matrix, coi_mask = inputs["scores"], inputs["score_matrix"], inputs["coi_mask"]
+    country_coi, country_pcs = inputs["country_coi"], inputs["country_pcs"]
+    min_max = get_min_max(inputs, args)
+    no_bid_limits = get_no_bid_limits(reviewer_ids, scores, args.max_no_bid)
+    full_mask = np.ones(score_matrix.shape, dtype=bool)
+    bid_mask = no_bid_mask(score_matrix, reviewer_ids, no_bid_limits)
+    full_nz = count_nonzeros(full_mask, coi_mask, bid_mask)
+
+    keep_mask = None
+    keep_pairs, keep_bonus, max_changes = [], 0, None
+    if args.previous_assignment:
+        previous_pairs = read_previous_assignment(args.previous_assignment)
+        # pairs of reviewers or papers that left, and new conflicts, have to change anyway
+        previous = np.array(previous_pairs, dtype=np.int64).reshape(-1, 2)
+        keep_mask = pairs_to_mask(previous[:, 0], previous[:, 1], reviewer_ids, paper_ids) \
+            & (score_matrix > COI_THRESHOLD)
+        keep_pairs = mask_to_pairs(keep_mask, reviewer_ids, paper_ids)
+        keep_bonus, max_changes = args.keep_bonus, args.max_changes
+        print(f"Previous assignment: {len(keep_pairs)} of {len(previous_pairs)} pairs still possible")
+
+    top_k = args.top_k
+    while True:
+        mask = candidate_mask(score_matrix, args.drop_coi, top_k, args.fill, args.seed,
+                              reviewer_mins=[min_max[r][0] for r in reviewer_ids])
+        if keep_mask is not None:
+            mask |= keep_mask
+        assignments = mask_to_pairs(mask, reviewer_ids, paper_ids)
+        print(f"Candidates (top_k={top_k}): {len(assignments)} / {full_mask.size} variables, "
+              f"{count_nonzeros(mask, coi_mask, bid_mask)} / {full_nz} nonzeros")
+
+        # the flow network cannot express the country and no-bid constraints
+        country_binding = (args.country_coi_max < args.assign_num
+                           and (mask & coi_mask).sum(axis=0).max(initial=0) > args.country_coi_max)
+        side_constraints = country_binding or bool(no_bid_limits) or max_changes is not None
+        solver = args.solver
+        if args.clusters:
+            if solver not in ("auto", "mip"):
+                print("Warning: --clusters always solves MIPs")
+            solver = "mip"
+        elif solver == "auto":
+            solver = "flow" if flow_available() and not side_constraints else "mip"
+        elif solver == "flow" and side_constraints:
+            print("Warning: the flow solver ignores --country_coi_max, --max_no_bid and --max_changes")
+        print("Solver:", solver)
+
+        heuristic_obj_val = start_pairs = None
+        if solver == "heuristic" or (solver == "mip" and args.heuristic_time >= 0
+                                     and not args.clusters):
+            heuristic_matrix, heuristic_time = score_matrix, args.heuristic_time
+            if keep_mask is not None:
+                heuristic_matrix = score_matrix + keep_bonus * keep_mask.astype(np.int32)
+                # local search knows nothing about --max_changes: start from the previous
+                # pairs and only fill the gaps
+                if max_changes is not None:
+                    heuristic_time = 0
+            status, heuristic_obj_val, rids, pids = run_heuristic(
+                    heuristic_matrix, mask, coi_mask, bid_mask, reviewer_ids, paper_ids, min_max,
+                    args.assign_num, args.country_coi_max, no_bid_limits, heuristic_time,
+                    keep_mask)
+            start_pairs = list(zip(rids.tolist(), pids.tolist()))
+        elif keep_pairs:
+            # without the heuristic, the previous pairs still start the MIP
+            start_pairs = keep_pairs
+        if args.clusters:
+            status, obj_val, rids, pids = solve_decomposed(
+                    inputs, easychair.read_submission_topics(args.input_dirpath), mask, min_max,
+                    args.assign_num, args.country_coi_max, no_bid_limits, args.clusters, args.jobs,
+                    threads, verbose, args.lazy_country, keep_mask, keep_pairs, keep_bonus,
+                    max_changes, args.target_gap)
+        elif solver != "heuristic":
+            status, obj_val, rids, pids = solve(solver, paper_ids, reviewer_ids, assignments, scores,
+                                                min_max, country_coi, country_pcs,
+                                                args.assign_num, args.country_coi_max, no_bid_limits,
+                                                start_pairs, args.lazy_country,
+                                                keep_pairs, keep_bonus, max_changes,
+                                                threads, verbose, max_gap=args.target_gap)
+        else:
+            obj_val = heuristic_obj_val
+        # the heuristic may leave papers short only for lack of candidates, too
+        incomplete = solver == "heuristic" and status == mip.OptimizationStatus.NO_SOLUTION_FOUND
+        if (status != mip.OptimizationStatus.INFEASIBLE and not incomplete) or top_k is None:
+            break
+        top_k = top_k * 2 if top_k * 2 < len(reviewer_ids) else None
+        print(f"{'Incomplete' if incomplete else 'Infeasible'} with the pruned candidates. "
+              f"Retrying with top_k={top_k}")
+
+    is_optimal = (status == mip.OptimizationStatus.OPTIMAL)
+
+    keep_obj_val = None
+    if keep_bonus and obj_val is not None:
+        # the solvers maximize the scores plus the bonus of the kept pairs; report them apart
+        keep_obj_val = keep_bonus * len(set(zip(rids.tolist(), pids.tolist())) & set(keep_pairs))
+        obj_val = pair_score(scores, rids, pids)
+        if heuristic_obj_val is not None:
+            heuristic_obj_val = pair_score(scores, *np.array(start_pairs, dtype=np.int64)
+                                           .reshape(-1, 2).T)
+
+    print("Is optimal?", is_optimal)
+    print("Objective value:", obj_val)
+    if keep_obj_val is not None:
+        print("Keep bonus:", keep_obj_val)
+    if heuristic_obj_val is not None and solver != "heuristic" and obj_val:
+        print(f"Heuristic objective value: {heuristic_obj_val} "
+              f"(gap {(obj_val - heuristic_obj_val) / abs(obj_val):.4%})")
+
+    if args.previous_assignment and status in (mip.OptimizationStatus.OPTIMAL,
+                                               mip.OptimizationStatus.FEASIBLE):
+        kept = len(set(zip(rids.tolist(), pids.tolist())) & set(previous_pairs))
+        print(f"Changes from the previous assignment: {len(previous_pairs) - kept} pairs removed, "
+              f"{len(rids) - kept} pairs added")
+
+    rids, pids = sort_assignments(rids, pids, reviewer_ids, paper_ids)
+    return {"status": status, "obj_val": obj_val, "solver": solver, "rids": rids, "pids": pids}
+
+
+# options a scenario of --sweep may not override
+SWEEP_FIXED = ["pc_filepath", "input_dirpath", "output_filepath", "sweep", "jobs", "report",
+               "validate"]
+
+
+def read_sweep(filepath, args):
+    with open(filepath) as f:
+        spec = json.load(f)
+    if isinstance(spec, dict):
+        # grid: every combination of the listed values
+        keys = list(spec)
+        values = [v if isinstance(v, list) else [v] for v in spec.values()]
+        spec = [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+    for scenario in spec:
+        for key in scenario:
+            if key in SWEEP_FIXED or not hasattr(args, key):
+                raise ValueError(f"Unknown option in {filepath}: {key}")
+        if scenario.get("top_k") is not None and scenario["top_k"] < 1:
+            raise ValueError(f"top_k must be at least 1 in {filepath}")
+    return spec
+
+
+def bid_stats(inputs, rids, pids):
+    # how well the bids are satisfied; a bid is a score of at least BID_SCORE
+    reviewer_index = pd.Index(inputs["reviewer_ids"])
+    paper_index = pd.Index(inputs["paper_ids"])
+    score_matrix = inputs["score_matrix"]
+    rows, cols = reviewer_index.get_indexer(rids), paper_index.get_indexer(pids)
+    is_bid = score_matrix[rows, cols] >= BID_SCORE
+    bidders = (score_matrix >= BID_SCORE).any(axis=1)
+    satisfied = np.zeros(len(reviewer_index), dtype=bool)
+    satisfied[rows[is_bid]] = True
+    paper_bids = np.zeros(len(paper_index), dtype=bool)
+    paper_bids[cols[is_bid]] = True
+    return {
+        "bid_pairs": int(is_bid.sum()),
+        "bid_ratio": round(float(is_bid.mean()), 4) if len(is_bid) else None,
+        "papers_without_bid": int((~paper_bids).sum()),
+        "bidders_without_bid": int((bidders & ~satisfied).sum()),
+    }
+
+
+def run_scenario(i, scenario, args, threads):
+    # the solver log of each scenario goes to its own file next to the summary
+    stem = os.path.splitext(args.output_filepath)[0]
+    scenario_args = copy.copy(args)
+    vars(scenario_args).update(scenario)
+    # the scenarios already run in parallel
+    scenario_args.jobs = 1
+    # a worker process solves several scenarios, each gets its own report
+    report.reset()
+    with open(f"{stem}.{i}.log", "w") as f, contextlib.redirect_stdout(f):
+        start = time.time()
+        result = assign(_worker_inputs, scenario_args, threads, verbose=False)
+        elapsed = time.time() - start
+    row = {"scenario": i}
+    row.update({key: getattr(scenario_args, key) for key in SWEEP_PARAMS})
+    row.update(scenario)
+    row.update({
+        "solver": result["solver"],
+        "status": result["status"].name,
+        "is_optimal": result["status"] == mip.OptimizationStatus.OPTIMAL,
+        "is_infeasible": result["status"] == mip.OptimizationStatus.INFEASIBLE,
+        "objective": result["obj_val"],
+        "time": round(elapsed, 1),
+    })
+    row.update(bid_stats(_worker_inputs, result["rids"], result["pids"]))
+    if result["status"] in (mip.OptimizationStatus.OPTIMAL, mip.OptimizationStatus.FEASIBLE):
+        with report.phase("write"):
+            write_assignments(f"{stem}.{i}.csv", result["rids"], result["pids"])
+    if args.validate:
+        validate_stem, ext = os.path.splitext(args.validate)
+        with open(f"{stem}.{i}.log", "a") as f, contextlib.redirect_stdout(f):
+            validate_assignment(f"{validate_stem}.{i}{ext}", scenario_args, result)
+    if args.report:
+        report_stem, ext = os.path.splitext(args.report)
+        write_report(f"{report_stem}.{i}{ext}", scenario_args, result)
+    return row
+
+
+def validate_assignment(filepath, args, result):
+    # the same report as test_assignment.py, from the tables this process already loaded
+    if result["status"] not in (mip.OptimizationStatus.OPTIMAL, mip.OptimizationStatus.FEASIBLE):
+        print("No assignment to validate")
+        return
+    with report.phase("validate"):
+        data = test_assignment.load_data(args.input_dirpath, args.pc_filepath)
+        assign_df = pd.DataFrame({"rid": result["rids"], "pid": result["pids"]})
+        sheets = test_assignment.validate(data, assign_df, args.assign_num, args.default_max,
+                                          args.country_coi_max)
+        test_assignment.write_report(filepath, *sheets)
+
+
+def write_report(filepath, args, result=None):
+    report.set_value("args", vars(args))
+    if result is not None:
+        report.set_value("result", {"solver": result["solver"], "status": result["status"].name,
+                                    "objective": result["obj_val"], "pairs": len(result["rids"])})
+    report.write(filepath)
+
+
+def sweep(inputs, args):
+    scenarios = read_sweep(args.sweep, args)
+    cpus = os.cpu_count() or 1
+    jobs = max(1, min(args.jobs or cpus, len(scenarios)))
+    threads = max(1, cpus // jobs)
+    print(f"Sweep: {len(scenarios)} scenarios, {jobs} jobs x {threads} threads")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=(inputs,)) as executor:
+        futures = {executor.submit(run_scenario, i, scenario, args, threads): i
+                   for i, scenario in enumerate(scenarios)}
+        for future in as_completed(futures):
+            row = future.result()
+            print(f"Scenario {row['scenario']}: {row['status']}, objective {row['objective']}, "
+                  f"{row['time']}s")
+            rows.append(row)
+
+    summary_df = pd.DataFrame(sorted(rows, key=lambda row: row["scenario"]))
+    with report.phase("write"):
+        summary_df.to_csv(args.output_filepath, index=False)
+    print(summary_df.to_string(index=False))
+
+
+# options that differ between the pools of reviewers (e.g., PCs and SPCs) of --pool;
+# the others are shared by all pools
+POOL_OPTIONS = ["pc_filepath", "output_filepath", "assign_num", "default_min", "default_max"]
+
+
+def read_pools(args):
+    # the pool of the positional arguments first, then those of --pool
+    pools = [{key: getattr(args, key) for key in POOL_OPTIONS}]
+    for pc_filepath, output_filepath, assign_num, default_min, default_max in args.pool or []:
+        pools.append({
+            "pc_filepath": pc_filepath,
+            "output_filepath": output_filepath,
+            "assign_num": assign_num,
+            "default_min": default_min,
+            "default_max": default_max,
+        })
+    pool_args = []
+    for pool in pools:
+        pool_args.append(copy.copy(args))
+        vars(pool_args[-1]).update(pool)
+        # the pools already run in parallel
+        pool_args[-1].jobs = 1
+    return pool_args
+
+
+def solve_joint(pool_inputs, pool_args, args, verbose=True):
+    # one MIP over all pools, so that --joint_country_coi_max can span them
+    shared = pool_inputs[0]
+    paper_ids, scores = shared["paper_ids"], shared["scores"]
+    country_coi, country_pcs = shared["country_coi"], shared["country_pcs"]
+    max_reviewers = max(len(inputs["reviewer_ids"]) for inputs in pool_inputs)
+    top_k = args.top_k
+    while True:
+        problems = []
+        for inputs, a in zip(pool_inputs, pool_args):
+            reviewer_ids, score_matrix = inputs["reviewer_ids"], inputs["score_matrix"]
+            min_max = get_min_max(inputs, a)
+            no_bid_limits = get_no_bid_limits(reviewer_ids, scores, a.max_no_bid)
+            mask = candidate_mask(score_matrix, a.drop_coi, top_k, a.fill, a.seed,
+                                  reviewer_mins=[min_max[r][0] for r in reviewer_ids])
+            start_pairs = []
+            if a.heuristic_time >= 0:
+                # each pool's own solution; CBC repairs it if the joint constraint is violated
+                bid_mask = no_bid_mask(score_matrix, reviewer_ids, no_bid_limits)
+                _, _, rids, pids = run_heuristic(score_matrix, mask, inputs["coi_mask"], bid_mask,
+                                                 reviewer_ids, paper_ids, min_max, a.assign_num,
+                                                 a.country_coi_max, no_bid_limits, a.heuristic_time)
+                start_pairs = list(zip(rids.tolist(), pids.tolist()))
+            problems.append((mask_to_pairs(mask, reviewer_ids, paper_ids), min_max, no_bid_limits,
+                             start_pairs))
+            print(f"Candidates of {a.pc_filepath} (top_k={top_k}): {len(problems[-1][0])} variables")
+
+        start = time.time()
+        with report.phase("model build"):
+            m = None
+            pool_vars = []
+            for i, (inputs, a, problem) in enumerate(zip(pool_inputs, pool_args, problems)):
+                assignments, min_max, no_bid_limits, _ = problem
+                m, assignment_vars = model(paper_ids, inputs["reviewer_ids"], assignments, scores,
+                                           min_max, country_coi, country_pcs, a.assign_num,
+                                           a.country_coi_max, no_bid_limits, m=m,
+                                           prefix=f"Pool{i}_")
+                pool_vars.append(assignment_vars)
+
+            paper_coi_vars = defaultdict(list)
+            for assignment_vars in pool_vars:
+                for (r, p), var in assignment_vars.items():
+                    if r in country_coi[p]:
+                        paper_coi_vars[p].append(var)
+            for p, coi_vars in paper_coi_vars.items():
+                if len(coi_vars) > args.joint_country_coi_max:
+                    add_country_constr(m, p, coi_vars, args.joint_country_coi_max, "Joint_")
+        print(f"Model build time: {time.time() - start:.1f}s")
+        report.record_model("joint", m)
+
+        m.start = [(assignment_vars[a], 1.0)
+                   for assignment_vars, problem in zip(pool_vars, problems)
+                   for a in problem[3] if a in assignment_vars]
+        m.threads = -1
+        m.verbose = int(verbose)
+        m.store_search_progress_log = True
+        if args.target_gap is not None:
+            m.max_mip_gap = args.target_gap
+        start = time.time()
+        with report.phase("solve"):
+            status = m.optimize(max_seconds=TIME_LIMIT)
+        print(f"Solve time: {time.time() - start:.1f}s")
+        report.record_progress("joint", m, time.time() - start)
+        if status != mip.OptimizationStatus.INFEASIBLE or top_k is None:
+            break
+        top_k = top_k * 2 if top_k * 2 < max_reviewers else None
+        print(f"Infeasible with the pruned candidates. Retrying with top_k={top_k}")
+
+    print("Is optimal?", status == mip.OptimizationStatus.OPTIMAL)
+    print("Objective value:", m.objective_value)
+    results = []
+    for inputs, assignment_vars in zip(pool_inputs, pool_vars):
+        rids, pids = extract_assignments(assignment_vars)
+        rids, pids = sort_assignments(rids, pids, inputs["reviewer_ids"], paper_ids)
+        # the share of the joint objective of this pool
+        obj_val = pair_score(scores, rids, pids) if len(rids) else None
+        results.append({"status": status, "obj_val": obj_val, "solver": "mip",
+                        "rids": rids, "pids": pids})
+    return results
+
+
+def write_pool(i, args, result):
+    if result["status"] in (mip.OptimizationStatus.OPTIMAL, mip.OptimizationStatus.FEASIBLE):
+        with report.phase("write"):
+            write_assignments(args.output_filepath, result["rids"], result["pids"])
+    if args.validate:
+        validate_stem, ext = os.path.splitext(args.validate)
+        validate_assignment(f"{validate_stem}.{i}{ext}", args, result)
+
+
+def run_pool(i, args, threads):
+    # the solver log of each pool goes next to its assignment
+    log_filepath = os.path.splitext(args.output_filepath)[0] + ".log"
+    report.reset()
+    with open(log_filepath, "w") as f, contextlib.redirect_stdout(f):
+        start = time.time()
+        result = assign(_worker_inputs[i], args, threads, verbose=False)
+        result["time"] = round(time.time() - start, 1)
+        write_pool(i, args, result)
+    if args.report:
+        report_stem, ext = os.path.splitext(args.report)
+        write_report(f"{report_stem}.{i}{ext}", args, result)
+    return result
+
+
+def solve_pools(args):
+    pool_args = read_pools(args)
+    shared = load_shared_inputs(args.input_dirpath)
+    pool_inputs = [load_pool_inputs(shared, a.pc_filepath, a.input_dirpath) for a in pool_args]
+
+    if args.joint_country_coi_max is not None:
+        if args.solver not in ("auto", "mip") or args.lazy_country:
+            print("Warning: --joint_country_coi_max always solves one MIP with every constraint")
+        start = time.time()
+        results = solve_joint(pool_inputs, pool_args, args)
+        for i, (a, result) in enumerate(zip(pool_args, results)):
+            result["time"] = round(time.time() - start, 1)
+            write_pool(i, a, result)
+    else:
+        # the pools are independent: one process each, sharing the loaded inputs
+        cpus = os.cpu_count() or 1
+        jobs = max(1, min(args.jobs or cpus, len(pool_args)))
+        threads = max(1, cpus // jobs)
+        print(f"Pools: {len(pool_args)} pools, {jobs} jobs x {threads} threads")
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                 initargs=(pool_inputs,)) as executor:
+            futures = [executor.submit(run_pool, i, a, threads) for i, a in enumerate(pool_args)]
+            results = [future.result() for future in futures]
+
+    rows = []
+    for i, (inputs, a, result) in enumerate(zip(pool_inputs, pool_args, results)):
+        row = {"pool": i, "pc_filepath": a.pc_filepath, "output_filepath": a.output_filepath,
+               "status": result["status"].name, "objective": result["obj_val"],
+               "pairs": len(result["rids"]), "time": result["time"]}
+        row.update(bid_stats(inputs, result["rids"], result["pids"]))
+        rows.append(row)
+    print(pd.DataFrame(rows).to_string(index=False))
+    report.set_value("pools", rows)
+
+    if args.joint_country_coi_max is not None:
+        rids = np.concatenate([result["rids"] for result in results])
+        pids = np.concatenate([result["pids"] for result in results])
+        violated = find_country_violations(rids, pids, shared["country_coi"],
+                                           args.joint_country_coi_max)
+        print("# of joint country COI violation:", len(violated))
+
+    # the output files of the pools without an assignment, which write_pool skipped
+    return [a.output_filepath for a, result in zip(pool_args, results)
+            if result["status"] not in (mip.OptimizationStatus.OPTIMAL,
+                                        mip.OptimizationStatus.FEASIBLE)]
+
+
 def main():
     from argparse import ArgumentParser
     parser = ArgumentParser(description="This script outputs the optimal assignment under given constraints.")
@@ -149,48 +896,108 @@ def main():
                         help="Format: [min_bid_num1]:[max_no_bid1],[min_bid_num2]:[max_no_bid2],... "
                         "A special constraint that only [max_no_bid] or fewer papers are assigned to "
                         "reviewers who bid [min_bid_num] or more papers.")
+    parser.add_argument("--drop_coi", action="store_true",
+                        help="Do not create variables for pairs with a declared COI.")
+    parser.add_argument("--top_k", type=int, default=None,
+                        help="Only consider the [top_k] highest-scoring reviewers of each paper "
+                        "(plus [fill] random ones). Doubled automatically while the problem is infeasible.")
+    parser.add_argument("--fill", type=int, default=0,
+                        help="Number of random reviewers added to the candidates of each paper "
+                        "when --top_k is given.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed for --fill.")
+    parser.add_argument("--solver", choices=["auto", "mip", "flow", "heuristic"], default="auto",
+                        help="mip solves the full model with CBC. flow solves it as a min-cost flow "
+                        "(requires OR-Tools), which ignores --country_coi_max and --max_no_bid. "
+                        "auto uses flow when those constraints cannot bind. heuristic only runs "
+                        "the greedy and local search heuristic, for a quick draft.")
+    parser.add_argument("--heuristic_time", type=int, default=60,
+                        help="Time limit in seconds of the local search that computes the starting "
+                        "solution of the MIP. A negative value disables the starting solution.")
+    parser.add_argument("--lazy_country", action="store_true",
+                        help="Solve the MIP without the country constraints first and add only "
+                        "the violated ones, re-solving until there is no violation.")
+    parser.add_argument("--previous_assignment", type=str, default=None,
+                        help="CSV file output by a previous run of this script. Its pairs are "
+                        "preferred and used as the starting solution.")
+    parser.add_argument("--max_changes", type=int, default=None,
+                        help="Maximum number of pairs of --previous_assignment that may be dropped, "
+                        "apart from those that are no longer possible (e.g., new conflicts).")
+    parser.add_argument("--keep_bonus", type=int, default=100,
+                        help="Score added to the pairs of --previous_assignment.")
+    parser.add_argument("--clusters", type=int, default=None,
+                        help="Split the problem into this many topic clusters solved in parallel, "
+                        "then repair the combined solution with one MIP.")
+    parser.add_argument("--sweep", type=str, default=None,
+                        help="JSON file of scenarios: a list of settings, or a grid mapping options "
+                        "to lists of values. Each scenario overrides the options given on the "
+                        "command line and output_filepath becomes the summary CSV.")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Number of scenarios of --sweep or clusters of --clusters solved "
+                        "concurrently (default: number of CPUs). The CPUs are split between them.")
+    parser.add_argument("--target_gap", type=float, default=None,
+                        help="Stop the MIP once the relative gap between the best solution and the "
+                        "bound is below this value (e.g., 0.001), instead of proving optimality.")
+    parser.add_argument("--report", type=str, default=None,
+                        help="JSON file with the time and peak memory of each phase, the model sizes "
+                        "and the progress of the solver. The progress is also written to "
+                        "[report].progress.csv.")
+    parser.add_argument("--validate", type=str, default=None,
+                        help="Excel (or .csv/.parquet) file to which the statistics of "
+                        "test_assignment.py are written, computed right after the assignment.")
+    parser.add_argument("--pool", nargs=5, action="append", default=None,
+                        metavar=("PC_FILEPATH", "OUTPUT_FILEPATH", "ASSIGN_NUM", "DEFAULT_MIN",
+                                 "DEFAULT_MAX"),
+                        help="Another pool of reviewers (e.g., SPC members) assigned in the same "
+                        "run, with its own PC list, output file and numbers; the other options "
+                        "are shared. Repeatable. The pools are solved concurrently.")
+    parser.add_argument("--joint_country_coi_max", type=int, default=None,
+                        help="Maximum number of reviewers per paper over all pools who belong to "
+                        "the same country/region as the authors. The pools are then solved as "
+                        "one MIP.")
     args = parser.parse_args()
-
-    paper_filepath = os.path.join(args.input_dirpath, "easychair.xlsx")
-    paper_df = pd.read_excel(paper_filepath, "Submissions", engine='openpyxl')
-    paper_ids = paper_df["#"].astype(int).tolist()
-    reviewer_filepath = os.path.join(args.input_dirpath, "reviewer.csv")
-    pc_df = read_reviewers(args.pc_filepath, reviewer_filepath)
-    reviewer_ids = pc_df["id"].astype(int).tolist()
-    max_nums = get_max_num(pc_df, args.default_max)
-    score_filepath = os.path.join(args.input_dirpath, "score.xlsx")
-    scores = read_scores(score_filepath)
-
-    assignments = [(j, i) for i in paper_ids for j in reviewer_ids]
-    min_max = {}
-    for r in reviewer_ids:
-        max_num = max_nums[r]
-        min_num = min([args.default_min, max_num])
-        min_max[r] = (min_num, max_num)
-
-    country_coi = find_country_coi(args.input_dirpath)
-    country_pcs = find_country_pcs(args.input_dirpath)
-
-    m = model(paper_ids, reviewer_ids, assignments, scores,
-              min_max, country_coi, country_pcs, 
-              args.assign_num, args.country_coi_max, args.max_no_bid)
-
-    m.threads = -1
-    status = m.optimize(max_seconds=TIME_LIMIT)
-    obj_val = m.objective_value
-    is_optimal = (status == mip.OptimizationStatus.OPTIMAL)
-
-    print("Is optimal?", is_optimal)
-
-    output_reviewer_df = []
-    for r in reviewer_ids:
-        assigned_papers = [p for p in paper_ids
-                if m.var_by_name(f"Var_a({(r, p)})").x == 1]
-        for p in assigned_papers:
-            output_reviewer_df.append([r, p])
-    output_reviewer_df = pd.DataFrame(output_reviewer_df, columns=["rid", "pid"])
-    output_reviewer_df.to_csv(args.output_filepath, index=None, header=None)
-
+    if args.top_k is not None and args.top_k < 1:
+        parser.error("--top_k must be at least 1")
+    if args.validate and test_assignment.missing_engine(args.validate):
+        parser.error("--validate with a .parquet file needs pyarrow (pip install pyarrow)")
+
+    if args.pool or args.joint_country_coi_max is not None:
+        if args.sweep or args.previous_assignment:
+            parser.error("--pool cannot be combined with --sweep or --previous_assignment")
+        if args.clusters and args.joint_country_coi_max is not None:
+            parser.error("--joint_country_coi_max cannot be combined with --clusters")
+        for pool in args.pool or []:
+            try:
+                pool[2:] = [int(value) for value in pool[2:]]
+            except ValueError:
+                parser.error(f"--pool {' '.join(pool)}: ASSIGN_NUM, DEFAULT_MIN and DEFAULT_MAX "
+                             "must be integers")
+        unwritten = solve_pools(args)
+        if args.report:
+            write_report(args.report, args)
+        if unwritten:
+            parser.exit(1, f"No assignment written to {', '.join(unwritten)}\n")
+        return
+
+    inputs = load_inputs(args.pc_filepath, args.input_dirpath)
+    if args.sweep:
+        sweep(inputs, args)
+        if args.report:
+            write_report(args.report, args)
+        return
+
+    result = assign(inputs, args)
+    solved = result["status"] in (mip.OptimizationStatus.OPTIMAL, mip.OptimizationStatus.FEASIBLE)
+    if solved:
+        with report.phase("write"):
+            write_assignments(args.output_filepath, result["rids"], result["pids"])
+    if args.validate:
+        validate_assignment(args.validate, args, result)
+    if args.report:
+        write_report(args.report, args, result)
+    if not solved:
+        parser.exit(1, f"No assignment written to {args.output_filepath}: "
+                       f"{result['status'].name}\n")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,143 @@
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import pandas as pd
+
+
+def exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_stage(command, log_filepath, timeout=None):
+    # runs one stage in a child process; os.wait4 gives the peak RSS of that child alone
+    start = time.time()
+    with open(log_filepath, "w") as log:
+        proc = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+        timer = threading.Timer(timeout, proc.kill) if timeout else None
+        if timer is not None:
+            timer.start()
+        _, status, rusage = os.wait4(proc.pid, 0)
+        if timer is not None:
+            timer.cancel()
+    proc.returncode = exit_code(status)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return {
+        "seconds": round(time.time() - start, 3),
+        "peak_rss_mb": round(rusage.ru_maxrss * unit / 2 ** 20, 1),
+        "returncode": proc.returncode,
+    }
+
+
+def read_assign_report(report_filepath):
+    # the phases of assign.py and the size of its (last) model, from its --report
+    with open(report_filepath) as f:
+        report = json.load(f)
+    rows = []
+    for phase in report["phases"]:
+        rows.append({"stage": f"assign: {phase['phase']}", "seconds": phase["seconds"],
+                     "peak_rss_mb": phase["peak_rss_mb"]})
+    phase_df = pd.DataFrame(rows, columns=["stage", "seconds", "peak_rss_mb"])
+    # repeated phases (e.g., retries with a larger --top_k) add up
+    phase_df = phase_df.groupby("stage", sort=False).agg({"seconds": "sum", "peak_rss_mb": "max"})
+    info = dict(report["models"][-1]) if report["models"] else {}
+    info.pop("model", None)
+    info.update({"status": report["result"]["status"], "objective": report["result"]["objective"]})
+    return phase_df.reset_index().to_dict("records"), info
+
+
+def benchmark(size, args):
+    papers = size
+    reviewers = max(1, int(size * args.reviewer_ratio))
+    dirpath = os.path.join(args.work_dirpath, f"papers_{size}")
+    os.makedirs(dirpath, exist_ok=True)
+    pc_filepath = os.path.join(dirpath, "pc.xlsx")
+    assignment_filepath = os.path.join(dirpath, "assignment.csv")
+    report_filepath = os.path.join(dirpath, "report.json")
+    python = sys.executable
+    here = os.path.dirname(os.path.abspath(__file__))
+    constraint_args = ["--assign_num", str(args.assign_num), "--default_max", str(args.default_max),
+                       "--country_coi_max", str(args.country_coi_max)]
+    stages = [
+        ("generate", [python, os.path.join(here, "generate_data.py"), dirpath,
+                      "--papers", str(papers), "--reviewers", str(reviewers),
+                      "--seed", str(args.seed)]),
+        ("compute_score", [python, os.path.join(here, "compute_score.py"), dirpath]),
+        ("assign", [python, os.path.join(here, "assign.py"), pc_filepath, dirpath,
+                    assignment_filepath, "--default_min", str(args.default_min),
+                    "--report", report_filepath] + constraint_args
+         + shlex.split(args.assign_args)),
+        ("test_assignment", [python, os.path.join(here, "test_assignment.py"), dirpath,
+                             pc_filepath, assignment_filepath,
+                             os.path.join(dirpath, "assignment_stat.xlsx")] + constraint_args),
+    ]
+
+    rows = []
+    for stage, command in stages:
+        if stage == "generate" and args.reuse and os.path.exists(pc_filepath):
+            continue
+        print(f"[{papers} papers] {stage} ...", flush=True)
+        result = run_stage(command, os.path.join(dirpath, f"{stage}.log"), args.timeout)
+        row = {"papers": papers, "reviewers": reviewers, "stage": stage}
+        row.update(result)
+        print(f"[{papers} papers] {stage}: {result['seconds']}s, {result['peak_rss_mb']} MB"
+              + (f", exit code {result['returncode']}" if result["returncode"] else ""), flush=True)
+        if stage == "assign" and result["returncode"] == 0:
+            phase_rows, info = read_assign_report(report_filepath)
+            row.update(info)
+            rows.append(row)
+            rows.extend(dict(phase_row, papers=papers, reviewers=reviewers)
+                        for phase_row in phase_rows)
+        else:
+            rows.append(row)
+        if result["returncode"] != 0:
+            # the later stages need this one's output
+            break
+    return rows
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description="This script runs the whole pipeline (generate_data.py, "
+                            "compute_score.py, assign.py and test_assignment.py) on synthetic "
+                            "conferences of increasing size and records the time and peak memory "
+                            "of each stage.")
+    parser.add_argument("work_dirpath", help="Directory where the synthetic inputs and outputs are written.")
+    parser.add_argument("output_filepath", help="CSV file including the measurements.")
+    parser.add_argument("--sizes", type=str, default="1000,5000,10000",
+                        help="Comma-separated numbers of papers.")
+    parser.add_argument("--reviewer_ratio", type=float, default=0.6,
+                        help="Number of reviewers in the generated data, relative to the papers.")
+    parser.add_argument("--assign_num", type=int, default=3,
+                        help="Number of reviewers per paper.")
+    parser.add_argument("--default_min", type=int, default=1,
+                        help="Default value of the minimum number of papers per reviewer.")
+    parser.add_argument("--default_max", type=int, default=8,
+                        help="Default value of the maximum number of papers per reviewer.")
+    parser.add_argument("--country_coi_max", type=int, default=1,
+                        help="Maximum number of reviewers per paper from the authors' country/region.")
+    parser.add_argument("--assign_args", type=str, default="--top_k 20",
+                        help="Other options given to assign.py, e.g., \"--top_k 20 --clusters 8\".")
+    parser.add_argument("--timeout", type=int, default=None,
+                        help="Seconds after which a stage is killed.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed of the generated data.")
+    parser.add_argument("--reuse", action="store_true",
+                        help="Do not generate the data again when it already exists.")
+    args = parser.parse_args()
+
+    rows = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        rows.extend(benchmark(size, args))
+        # written after every size, so that a killed run keeps what it measured
+        result_df = pd.DataFrame(rows)
+        result_df.to_csv(args.output_filepath, index=False)
+
+    table = result_df.pivot_table(index="stage", columns="papers", values="seconds")
+    print(table.reindex(pd.unique(result_df["stage"])).to_string())
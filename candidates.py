@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from settings import ASSIGNMENT_SCORES
+
+# only the declared-COI penalty pushes a score this low
+COI_THRESHOLD = ASSIGNMENT_SCORES["conflict"] // 2
+
+
+# a block of papers (or reviewers) is ranked at a time, so that the temporary index and
+# noise arrays hold about this many entries instead of one per reviewer-paper pair
+BLOCK_SIZE = 2 ** 22
+EXCLUDED = np.iinfo(np.int32).min
+
+
+def blocks(n_lines, line_length):
+    step = max(1, BLOCK_SIZE // max(line_length, 1))
+    for start in range(0, n_lines, step):
+        yield slice(start, min(start + step, n_lines))
+
+
+def top_rows(values, k):
+    # row indices of the k largest values of every column, in no particular order
+    n = values.shape[0]
+    return np.argpartition(values, n - k, axis=0)[n - k:]
+
+
+def candidate_mask(score_matrix, drop_coi=False, top_k=None, fill=0, seed=0, reviewer_mins=None):
+    # reviewer x paper boolean matrix of the pairs that get a variable in the model
+    n_reviewers, n_papers = score_matrix.shape
+    allowed = np.ones(score_matrix.shape, dtype=bool)
+    if drop_coi:
+        allowed &= score_matrix > COI_THRESHOLD
+    if top_k is None or top_k >= n_reviewers:
+        return allowed
+
+    def ranked(rows, cols):
+        # int32 scores of a block, with the pairs that are not allowed ranked last
+        values = score_matrix[rows, cols]
+        return np.where(allowed[rows, cols], values, EXCLUDED) if drop_coi else values
+
+    keep = np.zeros_like(allowed)
+    for b in blocks(n_papers, n_reviewers):
+        cols = np.arange(b.start, b.stop)
+        keep[top_rows(ranked(slice(None), b), top_k), cols] = True
+
+    # every reviewer also keeps their best papers up to their lower bound
+    if reviewer_mins is not None:
+        reviewer_mins = np.asarray(reviewer_mins, dtype=np.int64)
+        k = min(int(reviewer_mins.max(initial=0)), n_papers)
+        for b in blocks(n_reviewers, n_papers) if k > 0 else []:
+            values = ranked(b, slice(None))
+            best = top_rows(values.T, k).T
+            # best first among the k
+            order = np.argsort(-np.take_along_axis(values, best, axis=1).astype(np.int64),
+                               axis=1, kind="stable")
+            best = np.take_along_axis(best, order, axis=1)
+            rows, ranks = np.nonzero(np.arange(k) < reviewer_mins[b, None])
+            keep[b.start + rows, best[rows, ranks]] = True
+    keep &= allowed
+
+    # random extra reviewers per paper keep room for the load and country constraints
+    if fill > 0:
+        rng = np.random.default_rng(seed)
+        for b in blocks(n_papers, n_reviewers):
+            noise = rng.random((n_reviewers, b.stop - b.start))
+            noise[keep[:, b] | ~allowed[:, b]] = -1
+            top = top_rows(noise, min(fill, n_reviewers))
+            cols = np.broadcast_to(np.arange(b.start, b.stop), top.shape)
+            chosen = allowed[top, cols]
+            keep[top[chosen], cols[chosen]] = True
+    return keep
+
+
+def mask_to_pairs(mask, reviewer_ids, paper_ids):
+    # (rid, pid) pairs ordered by paper, then by reviewer
+    pidx, ridx = np.nonzero(mask.T)
+    reviewer_ids = np.asarray(reviewer_ids)
+    paper_ids = np.asarray(paper_ids)
+    return list(zip(reviewer_ids[ridx].tolist(), paper_ids[pidx].tolist()))
+
+
+def pairs_to_mask(rids, pids, reviewer_ids, paper_ids):
+    # pairs of other reviewers or papers are ignored
+    rows = pd.Index(reviewer_ids).get_indexer(np.asarray(rids, dtype=np.int64))
+    cols = pd.Index(paper_ids).get_indexer(np.asarray(pids, dtype=np.int64))
+    found = (rows >= 0) & (cols >= 0)
+    mask = np.zeros((len(reviewer_ids), len(paper_ids)), dtype=bool)
+    mask[rows[found], cols[found]] = True
+    return mask
+
+
+def count_nonzeros(mask, coi_mask, no_bid_mask):
+    # every variable sits in its paper, max and min rows, plus the country and no-bid rows
+    return int(3 * mask.sum() + (mask & coi_mask).sum() + (mask & no_bid_mask).sum())
@@ -1,67 +1,181 @@
 import pandas as pd
+import numpy as np
 import os
-from collections import defaultdict
+import easychair
 from settings import ASSIGNMENT_SCORES
+from incidence import incidence
+from score_store import ScoreStore, EXCEL_MAX_ROWS, patch_score_file
 
-def parse_topics(df):
-    topics = defaultdict(set)
-    for idx, (identifier, topic) in df.iterrows():
-        topics[identifier].add(topic)
-    return topics
+# parsed inputs of the last run that wrote score.npy, the baseline of --incremental
+SNAPSHOT_FILENAME = "score_snapshot.pkl"
 
-def add_topic_score(input_dirpath):
-    rev_topic_filepath = os.path.join(args.input_dirpath, "reviewer_topic.csv")
-    rev_topic_df = pd.read_csv(rev_topic_filepath, header=None)
-    rev_topics = parse_topics(rev_topic_df)
-
-    paper_topic_filepath = os.path.join(args.input_dirpath, "submission_topic.csv")
-    paper_topic_df = pd.read_csv(paper_topic_filepath, header=None)
-    paper_topics = parse_topics(paper_topic_df)
-
-    topic_scores = []
-    for rid in rev_topics:
-        for pid in paper_topics:
-            fit = len(rev_topics[rid] & paper_topics[pid])
-            if fit > 0:
-                score = fit * ASSIGNMENT_SCORES["topic"]
-                topic_scores.append([rid, pid, score])
-    topic_score_df = pd.DataFrame(topic_scores, columns=["rid", "pid", "score"])
+def topic_incidence(df, topic_index):
+    # identifier x topic 0/1 matrix; rows follow the first appearance of each identifier
+    df = df.drop_duplicates()
+    return incidence(df["id"], df["topic"], topic_index)
+
+def compute_topic_scores(rev_topic_df, paper_topic_df):
+    topic_index = pd.Index(pd.unique(pd.concat([rev_topic_df["topic"], paper_topic_df["topic"]])))
+    rev_matrix, rids = topic_incidence(rev_topic_df, topic_index)
+    paper_matrix, pids = topic_incidence(paper_topic_df, topic_index)
+
+    # (reviewer x topic) @ (topic x paper) counts the shared topics of every pair at once
+    fit = (rev_matrix @ paper_matrix.T).tocsr()
+    fit.eliminate_zeros()
+    fit.sort_indices()
+    fit = fit.tocoo()
+    topic_score_df = pd.DataFrame({
+        "rid": rids[fit.row],
+        "pid": pids[fit.col],
+        "score": fit.data.astype(np.int64) * ASSIGNMENT_SCORES["topic"]})
     return topic_score_df
 
+def add_topic_score(input_dirpath):
+    rev_topic_df = easychair.read_reviewer_topics(input_dirpath)
+    paper_topic_df = easychair.read_submission_topics(input_dirpath)
+    return compute_topic_scores(rev_topic_df, paper_topic_df)
+
+
+def read_score_inputs(input_dirpath):
+    return {
+        "bid": easychair.read_bids(input_dirpath),
+        "conflict": easychair.read_conflicts(input_dirpath),
+        "reviewer_topic": easychair.read_reviewer_topics(input_dirpath),
+        "submission_topic": easychair.read_submission_topics(input_dirpath),
+    }
+
+
+def bid_scores(bid_df):
+    bid_df = bid_df.copy()
+    bid_df["score"] = bid_df.pref.apply(lambda x: ASSIGNMENT_SCORES[x])
+    return bid_df[["rid", "pid", "score"]]
+
+
+def coi_scores(coi_df):
+    coi_df = coi_df.copy()
+    coi_df["score"] = ASSIGNMENT_SCORES["conflict"]
+    return coi_df
+
+
+def compute_scores(inputs):
+    return merge_score_dfs([compute_topic_scores(inputs["reviewer_topic"], inputs["submission_topic"]),
+                            bid_scores(inputs["bid"]),
+                            coi_scores(inputs["conflict"])])
+
 
 def merge_score_dfs(dfs):
-    scores = defaultdict(int)
-    for df in dfs:
-        for idx, (rid, pid, score) in df.iterrows():
-            scores[(rid, pid)] += score
-    scores = [(rid, pid, score) for (rid, pid), score in scores.items()]
-    score_df = pd.DataFrame(scores, columns=["rid", "pid", "score"])
+    # group-by-sum over all frames; pairs keep the order of their first appearance
+    df = pd.concat([df[["rid", "pid", "score"]] for df in dfs], ignore_index=True)
+    score_df = df.groupby(["rid", "pid"], sort=False)["score"].sum().reset_index()
     return score_df
 
+
+def changed_rows(old_df, new_df, keys):
+    # keys of the rows that were added, removed or modified
+    merged = pd.merge(old_df.drop_duplicates(), new_df.drop_duplicates(), how="outer", indicator=True)
+    return merged.loc[merged["_merge"] != "both", keys].drop_duplicates()
+
+
+def region_mask(df, rids, pids, cells):
+    # pairs of the given reviewers, of the given papers, or among the given cells
+    cell_keys = pd.MultiIndex.from_frame(cells[["rid", "pid"]])
+    return (df["rid"].isin(rids) | df["pid"].isin(pids)
+            | pd.MultiIndex.from_arrays([df["rid"], df["pid"]]).isin(cell_keys))
+
+
+def compute_region_scores(inputs, rids, pids, cells):
+    # the scores of compute_scores(inputs), but only in the region; the topic pass only
+    # multiplies the rows of the reviewers and papers involved
+    rev_topic_df, paper_topic_df = inputs["reviewer_topic"], inputs["submission_topic"]
+    topic_dfs = [
+        compute_topic_scores(rev_topic_df[rev_topic_df["id"].isin(rids)], paper_topic_df),
+        compute_topic_scores(rev_topic_df, paper_topic_df[paper_topic_df["id"].isin(pids)]),
+        compute_topic_scores(rev_topic_df[rev_topic_df["id"].isin(cells["rid"])],
+                             paper_topic_df[paper_topic_df["id"].isin(cells["pid"])]),
+    ]
+    topic_df = pd.concat(topic_dfs, ignore_index=True).drop_duplicates(["rid", "pid"])
+    bid_df, coi_df = bid_scores(inputs["bid"]), coi_scores(inputs["conflict"])
+    score_df = merge_score_dfs([df[region_mask(df, rids, pids, cells)]
+                                for df in [topic_df, bid_df, coi_df]])
+    return score_df
+
+
+def update_scores(input_dirpath, old_inputs, inputs):
+    # (rid, pid, old_score, new_score) of every pair whose score changed
+    cells = pd.concat([changed_rows(old_inputs["bid"], inputs["bid"], ["rid", "pid"]),
+                       changed_rows(old_inputs["conflict"], inputs["conflict"], ["rid", "pid"])],
+                      ignore_index=True).drop_duplicates()
+    rids = changed_rows(old_inputs["reviewer_topic"], inputs["reviewer_topic"], ["id"])["id"]
+    pids = changed_rows(old_inputs["submission_topic"], inputs["submission_topic"], ["id"])["id"]
+    print(f"Changed: {len(cells)} bids or conflicts, topics of {len(rids)} reviewers "
+          f"and {len(pids)} papers")
+
+    new_df = compute_region_scores(inputs, rids, pids, cells)
+    store = ScoreStore.load(os.path.join(input_dirpath, "score.npy"))
+    in_region = np.isin(store.rids, rids) | np.isin(store.pids, pids)
+    positions = store.locate(cells["rid"], cells["pid"])
+    in_region[positions[positions >= 0]] = True
+    old_df = pd.DataFrame({name: np.asarray(store.table[name][in_region], dtype=np.int64)
+                           for name in ["rid", "pid", "score"]})
+    change_df = pd.merge(old_df, new_df, on=["rid", "pid"], how="outer",
+                         suffixes=("_old", "_new")).fillna(0)
+    change_df.columns = ["rid", "pid", "old_score", "new_score"]
+    change_df = change_df.astype("int64")
+    change_df = change_df[change_df["old_score"] != change_df["new_score"]]
+    return change_df.sort_values(["rid", "pid"]).reset_index(drop=True)
+
+
 if __name__ == '__main__':
     from argparse import ArgumentParser
     parser = ArgumentParser(description="This script computes the score of each assignment. "
-                            "The scores are output in [input_dirpath]/score.xlsx")
+                            "The scores are output in [input_dirpath]/score.npy "
+                            "and/or [input_dirpath]/score.xlsx")
     parser.add_argument("input_dirpath",
                         help="The directory where files from EasyChair are located.")
+    parser.add_argument("--format", choices=["npy", "xlsx", "both"], default="npy",
+                        help="Output format. npy is a binary file read by assign.py; "
+                        "xlsx is for browsing the scores in Excel.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only recompute the scores affected by the changes of bid.csv, "
+                        "conflict.csv and the topic files since the last run, and update "
+                        "score.npy in place.")
+    parser.add_argument("--changes_filepath", type=str, default=None,
+                        help="CSV file listing the pairs whose score changed with --incremental "
+                        "(default: [input_dirpath]/score_changes.csv).")
     args = parser.parse_args()
+    if args.incremental and args.format != "npy":
+        parser.error("--incremental only updates score.npy")
 
-    # topical fit
-    topic_score_df = add_topic_score(args.input_dirpath)
+    inputs = read_score_inputs(args.input_dirpath)
+    snapshot_filepath = os.path.join(args.input_dirpath, SNAPSHOT_FILENAME)
+    npy_filepath = os.path.join(args.input_dirpath, "score.npy")
+    if args.incremental and not (os.path.exists(snapshot_filepath) and os.path.exists(npy_filepath)):
+        print(f"No previous score.npy and {SNAPSHOT_FILENAME}. Computing all scores.")
+        args.incremental = False
 
-    # bid
-    bid_filepath = os.path.join(args.input_dirpath, "bid.csv")
-    bid_df = pd.read_csv(bid_filepath, header=None)
-    bid_df.columns = ["rid", "pid", "pref"]
-    bid_df["score"] = bid_df.pref.apply(lambda x: ASSIGNMENT_SCORES[x])
-    bid_df = bid_df[["rid", "pid", "score"]]
-
-    # declared COI
-    coi_filepath = os.path.join(args.input_dirpath, "conflict.csv")
-    coi_df = pd.read_csv(coi_filepath, header=None)
-    coi_df.columns = ["rid", "pid"]
-    coi_df["score"] = ASSIGNMENT_SCORES["conflict"]
+    if args.incremental:
+        change_df = update_scores(args.input_dirpath, pd.read_pickle(snapshot_filepath), inputs)
+        updated, inserted = patch_score_file(npy_filepath, change_df["rid"], change_df["pid"],
+                                             change_df["new_score"])
+        changes_filepath = args.changes_filepath or os.path.join(args.input_dirpath, "score_changes.csv")
+        change_df.to_csv(changes_filepath, index=False)
+        print(f"{len(change_df)} scores changed ({updated} updated in place, {inserted} inserted) "
+              f"for {change_df['rid'].nunique()} reviewers and {change_df['pid'].nunique()} papers: "
+              f"{changes_filepath}")
+    else:
+        score_df = compute_scores(inputs)
+        if args.format in ("xlsx", "both"):
+            if len(score_df) >= EXCEL_MAX_ROWS:
+                raise ValueError(f"{len(score_df)} scores do not fit in an Excel sheet. "
+                                 "Use --format npy.")
+            score_filepath = os.path.join(args.input_dirpath, "score.xlsx")
+            score_df.to_excel(score_filepath, index=None)
+        if args.format in ("npy", "both"):
+            ScoreStore.from_frame(score_df).save(npy_filepath)
+        elif os.path.exists(npy_filepath):
+            # assign.py prefers score.npy, which would be stale now
+            os.remove(npy_filepath)
+            print(f"Removed the previous {npy_filepath}")
 
-    score_df = merge_score_dfs([topic_score_df, bid_df, coi_df])
-    score_filepath = os.path.join(args.input_dirpath, "score.xlsx")
-    score_df.to_excel(score_filepath, index=None)
+    if args.format in ("npy", "both"):
+        pd.to_pickle(inputs, snapshot_filepath)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from incidence import incidence
+
+
+def country_coi_pairs(reviewer_df, author_df):
+    # (rid, pid) pairs where the reviewer belongs to the country/region of an author of the paper.
+    # reviewer_df has "id" and "country" columns, author_df "submission #" and "country";
+    # unknown countries never conflict.
+    reviewer_df = reviewer_df[["id", "country"]].dropna().drop_duplicates()
+    paper_df = author_df[["submission #", "country"]].dropna().drop_duplicates()
+    country_index = pd.Index(pd.unique(pd.concat([reviewer_df["country"], paper_df["country"]])))
+    rev_matrix, rids = incidence(reviewer_df["id"], reviewer_df["country"], country_index)
+    paper_matrix, pids = incidence(paper_df["submission #"], paper_df["country"], country_index)
+
+    # (paper x country) @ (country x reviewer) is nonzero exactly for the pairs sharing a country
+    coi = (paper_matrix @ rev_matrix.T).tocoo()
+    return rids[coi.col], pids[coi.row]
+
+
+def country_coi_sets(rids, pids):
+    # paper id -> set of reviewer ids with a country COI
+    country_coi = defaultdict(set)
+    order = np.argsort(pids, kind="stable")
+    rids, pids = rids[order], pids[order]
+    bounds = np.flatnonzero(np.diff(pids)) + 1
+    for group_rids, group_pids in zip(np.split(rids, bounds), np.split(pids, bounds)):
+        if len(group_pids):
+            country_coi[int(group_pids[0])] = set(group_rids.tolist())
+    return country_coi
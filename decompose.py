@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from incidence import incidence
+
+# a cluster may hold this much more than its even share of the papers
+BALANCE_SLACK = 1.1
+
+
+def paper_topic_matrix(paper_topic_df, paper_ids):
+    # paper x topic 0/1 matrix, rows in the order of paper_ids
+    df = paper_topic_df[paper_topic_df["id"].isin(paper_ids)].drop_duplicates()
+    topic_index = pd.Index(pd.unique(df["topic"]))
+    return incidence(df["id"], df["topic"], topic_index, pd.Index(paper_ids))[0]
+
+
+def topic_clusters(paper_topic_df, paper_ids, n_clusters):
+    # cluster label of every paper. Topics are placed largest first (LPT): each goes to the
+    # cluster it shares most papers with among those still below the balance cap, so that
+    # the clusters are about the same size and few papers straddle two of them.
+    matrix = paper_topic_matrix(paper_topic_df, paper_ids)
+    counts = np.asarray(matrix.sum(axis=1)).ravel()
+    # a paper with m topics weighs 1/m on each of them
+    weighted = sp.diags(1.0 / np.maximum(counts, 1)) @ matrix
+    sizes = np.asarray(weighted.sum(axis=0)).ravel()
+    cooccurrence = (matrix.T @ matrix).toarray()
+
+    cap = sizes.sum() / n_clusters * BALANCE_SLACK
+    loads = np.zeros(n_clusters)
+    topic_onehot = np.zeros((matrix.shape[1], n_clusters))
+    for t in np.argsort(-sizes, kind="stable"):
+        affinity = cooccurrence[t] @ topic_onehot
+        room = loads + sizes[t] <= cap
+        if not room.any():
+            room[:] = True
+        # most shared papers first, then the least loaded
+        c = max(np.flatnonzero(room), key=lambda c: (affinity[c], -loads[c]))
+        topic_onehot[t, c] = 1
+        loads[c] += sizes[t]
+
+    # Each paper then goes to the cluster holding most of its topics, among those below the
+    # cap on the number of papers, ties to the one with the fewest papers so far. Papers with
+    # a clear choice are placed first; those without topics fill up the smallest clusters last.
+    affinity = np.asarray(matrix @ topic_onehot)
+    paper_cap = np.ceil(len(paper_ids) / n_clusters * BALANCE_SLACK)
+    paper_counts = np.zeros(n_clusters, dtype=np.int64)
+    labels = np.zeros(len(paper_ids), dtype=np.int64)
+    share = affinity.max(axis=1, initial=0) / np.maximum(counts, 1)
+    for i in np.argsort(-share, kind="stable"):
+        key = affinity[i] * (len(paper_ids) + 1) - paper_counts
+        key[paper_counts >= paper_cap] = -np.inf
+        labels[i] = key.argmax()
+        paper_counts[labels[i]] += 1
+    return labels
+
+
+def cluster_affinity(score_matrix, labels, n_clusters):
+    # reviewer x cluster sum of the positive scores (topics and bids) of the cluster's papers
+    onehot = np.zeros((len(labels), n_clusters))
+    onehot[np.arange(len(labels)), labels] = 1
+    return np.clip(score_matrix, 0, None).astype(np.float64) @ onehot
+
+
+def split_capacity(affinity, totals):
+    # split each reviewer's total over the clusters in proportion to their affinity,
+    # rounding by largest remainder so that the parts add up to the total
+    affinity = np.array(affinity, dtype=np.float64)
+    totals = np.asarray(totals, dtype=np.int64)
+    affinity[affinity.sum(axis=1) == 0] = 1
+    share = affinity / affinity.sum(axis=1, keepdims=True) * totals[:, None]
+    caps = np.floor(share).astype(np.int64)
+    remainder = totals - caps.sum(axis=1)
+    order = np.argsort(-(share - caps), axis=1, kind="stable")
+    ranks = np.argsort(order, axis=1)
+    return caps + (ranks < remainder[:, None])
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import pandas as pd
+
+# Every EasyChair input is parsed once into a typed DataFrame and pickled next to it,
+# keyed by the content hash of the source file, so later runs of any script skip the parse.
+CACHE_DIRNAME = ".easychair_cache"
+
+_tables = {}
+
+
+def file_digest(filepath):
+    h = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cached_table(filepath, key, parse):
+    digest = file_digest(filepath)
+    if (filepath, key, digest) in _tables:
+        return _tables[(filepath, key, digest)].copy()
+
+    dirpath, filename = os.path.split(os.path.abspath(filepath))
+    cache_dirpath = os.path.join(dirpath, CACHE_DIRNAME)
+    prefix = f"{filename}.{key}."
+    cache_filepath = os.path.join(cache_dirpath, f"{prefix}{digest}.pkl")
+    df = None
+    if os.path.exists(cache_filepath):
+        try:
+            df = pd.read_pickle(cache_filepath)
+        except Exception:
+            df = None
+    if df is None:
+        df = parse(filepath)
+        os.makedirs(cache_dirpath, exist_ok=True)
+        # several processes (e.g., --sweep workers) may miss the cache at once: stale entries
+        # may already be gone, and each writes its own temporary file and renames it atomically
+        for name in os.listdir(cache_dirpath):
+            if name.startswith(prefix) and name.endswith(".pkl") and \
+                    name != os.path.basename(cache_filepath):
+                try:
+                    os.remove(os.path.join(cache_dirpath, name))
+                except FileNotFoundError:
+                    pass
+        tmp_filepath = f"{cache_filepath}.{os.getpid()}.tmp"
+        df.to_pickle(tmp_filepath)
+        os.replace(tmp_filepath, cache_filepath)
+    _tables[(filepath, key, digest)] = df
+    return df.copy()
+
+
+def read_sheet(filepath, sheet_name=0, int_columns=()):
+    def parse(filepath):
+        df = pd.read_excel(filepath, sheet_name=sheet_name, engine='openpyxl')
+        for column in int_columns:
+            df[column] = df[column].astype("int64")
+        return df
+    return cached_table(filepath, f"sheet-{sheet_name}", parse)
+
+
+def read_csv(filepath, columns, int_columns=()):
+    def parse(filepath):
+        df = pd.read_csv(filepath, header=None)
+        df.columns = columns
+        for column in int_columns:
+            df[column] = df[column].astype("int64")
+        return df
+    return cached_table(filepath, "csv", parse)
+
+
+def read_submissions(input_dirpath):
+    return read_sheet(os.path.join(input_dirpath, "easychair.xlsx"), "Submissions", ["#"])
+
+
+def read_authors(input_dirpath):
+    return read_sheet(os.path.join(input_dirpath, "easychair.xlsx"), "Authors", ["submission #"])
+
+
+def read_program_committee(input_dirpath):
+    return read_sheet(os.path.join(input_dirpath, "easychair.xlsx"), "Program committee")
+
+
+def read_pc_list(pc_filepath):
+    return read_sheet(pc_filepath)
+
+
+def read_reviewer_csv(input_dirpath):
+    return read_csv(os.path.join(input_dirpath, "reviewer.csv"),
+                    ["id", "name", "email", "role"], ["id"])
+
+
+def read_bids(input_dirpath):
+    return read_csv(os.path.join(input_dirpath, "bid.csv"),
+                    ["rid", "pid", "pref"], ["rid", "pid"])
+
+
+def read_conflicts(input_dirpath):
+    return read_csv(os.path.join(input_dirpath, "conflict.csv"),
+                    ["rid", "pid"], ["rid", "pid"])
+
+
+def read_reviewer_topics(input_dirpath):
+    return read_csv(os.path.join(input_dirpath, "reviewer_topic.csv"), ["id", "topic"], ["id"])
+
+
+def read_submission_topics(input_dirpath):
+    return read_csv(os.path.join(input_dirpath, "submission_topic.csv"), ["id", "topic"], ["id"])
+
+
+def read_pc_members(pc_filepath, input_dirpath):
+    # the PC list joined with reviewer.csv to get the EasyChair reviewer ids
+    return pd.merge(read_pc_list(pc_filepath), read_reviewer_csv(input_dirpath), on="email")
+
+
+def read_pc_countries(input_dirpath):
+    # reviewer id and country of every member of the "Program committee" sheet
+    pc_df = pd.merge(read_program_committee(input_dirpath), read_reviewer_csv(input_dirpath),
+                     on="email")
+    return pc_df[["id", "country"]]
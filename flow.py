@@ -0,0 +1,53 @@
+import numpy as np
+import mip
+
+try:
+    from ortools.graph.python import min_cost_flow
+except ImportError:
+    min_cost_flow = None
+
+
+def flow_available():
+    return min_cost_flow is not None
+
+
+def solve_flow(assignments, pair_scores, reviewer_ids, paper_ids, min_max, assign_num):
+    # Without the country and no-bid constraints the assignment is a bipartite b-matching:
+    #   source -> reviewer r  (lower bound min_r, capacity max_r)
+    #   reviewer r -> paper p (capacity 1, cost -score) for every candidate pair
+    #   paper p -> sink       (demand assign_num)
+    # The lower bounds are moved into the node supplies: every reviewer supplies min_r
+    # and the source the remaining assign_num * #papers - sum(min_r) units.
+    if min_cost_flow is None:
+        raise ImportError("The flow solver requires OR-Tools (pip install ortools).")
+
+    reviewer_node = {r: i + 1 for i, r in enumerate(reviewer_ids)}
+    paper_node = {p: i + 1 + len(reviewer_ids) for i, p in enumerate(paper_ids)}
+    mins = np.array([int(min_max[r][0]) for r in reviewer_ids], dtype=np.int64)
+    maxs = np.array([int(min_max[r][1]) for r in reviewer_ids], dtype=np.int64)
+    total = assign_num * len(paper_ids)
+    if total < mins.sum() or (maxs < mins).any():
+        return mip.OptimizationStatus.INFEASIBLE, None, np.zeros(0, np.int64), np.zeros(0, np.int64)
+
+    keys = np.array(assignments, dtype=np.int64).reshape(-1, 2)
+    pair_starts = np.array([reviewer_node[r] for r in keys[:, 0]], dtype=np.int64)
+    pair_ends = np.array([paper_node[p] for p in keys[:, 1]], dtype=np.int64)
+    reviewer_nodes = np.arange(1, len(reviewer_ids) + 1, dtype=np.int64)
+
+    smcf = min_cost_flow.SimpleMinCostFlow()
+    smcf.add_arcs_with_capacity_and_unit_cost(
+            np.zeros(len(reviewer_ids), dtype=np.int64), reviewer_nodes,
+            maxs - mins, np.zeros(len(reviewer_ids), dtype=np.int64))
+    pair_arcs = smcf.add_arcs_with_capacity_and_unit_cost(
+            pair_starts, pair_ends,
+            np.ones(len(keys), dtype=np.int64), -np.asarray(pair_scores, dtype=np.int64))
+    nodes = np.arange(1 + len(reviewer_ids) + len(paper_ids), dtype=np.int64)
+    supplies = np.concatenate([[total - mins.sum()], mins,
+                               np.full(len(paper_ids), -assign_num, dtype=np.int64)])
+    smcf.set_nodes_supplies(nodes, supplies)
+
+    status = smcf.solve()
+    if status != smcf.OPTIMAL:
+        return mip.OptimizationStatus.INFEASIBLE, None, np.zeros(0, np.int64), np.zeros(0, np.int64)
+    chosen = smcf.flows(pair_arcs) > 0
+    return mip.OptimizationStatus.OPTIMAL, -smcf.optimal_cost(), keys[chosen, 0], keys[chosen, 1]
@@ -0,0 +1,165 @@
+import os
+import numpy as np
+import pandas as pd
+
+# countries/regions of authors and reviewers, most frequent first
+COUNTRIES = ["China", "USA", "UK", "Germany", "Japan", "Netherlands", "Italy", "Australia",
+             "Canada", "Singapore", "South Korea", "India", "France", "Spain", "Switzerland",
+             "Brazil", "Israel", "Denmark", "Ireland", "Belgium"]
+
+
+def zipf_weights(n, exponent):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def sample_topics(rng, n, topic_weights, min_num, max_num):
+    # n sets of distinct topics, popular topics more likely
+    return [rng.choice(len(topic_weights), size=rng.integers(min_num, max_num + 1),
+                       replace=False, p=topic_weights)
+            for _ in range(n)]
+
+
+def generate(n_papers, n_reviewers, n_topics=50, bids_per_reviewer=25, max_ratio=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    topics = [f"Topic {t + 1}" for t in range(n_topics)]
+    topic_weights = zipf_weights(n_topics, 0.8)
+    country_weights = zipf_weights(len(COUNTRIES), 1.0)
+    paper_ids = np.arange(1001, 1001 + n_papers)
+    reviewer_ids = np.arange(1, n_reviewers + 1)
+    emails = [f"reviewer{r}@example.org" for r in reviewer_ids]
+
+    paper_topics = sample_topics(rng, n_papers, topic_weights, 1, 4)
+    reviewer_topics = sample_topics(rng, n_reviewers, topic_weights, 2, 6)
+    submission_topic_df = pd.DataFrame({
+        "id": np.repeat(paper_ids, [len(t) for t in paper_topics]),
+        "topic": [topics[t] for ts in paper_topics for t in ts]})
+    reviewer_topic_df = pd.DataFrame({
+        "id": np.repeat(reviewer_ids, [len(t) for t in reviewer_topics]),
+        "topic": [topics[t] for ts in reviewer_topics for t in ts]})
+
+    # bids: mostly on papers sharing a topic with the reviewer, some anywhere
+    papers_by_topic = [[] for _ in topics]
+    for i, ts in enumerate(paper_topics):
+        for t in ts:
+            papers_by_topic[t].append(i)
+    bid_rows = []
+    for r, ts in zip(reviewer_ids, reviewer_topics):
+        n_bids = min(n_papers, rng.poisson(bids_per_reviewer)) if rng.random() > 0.1 else 0
+        related = np.unique(np.concatenate([papers_by_topic[t] for t in ts]).astype(np.int64))
+        n_related = min(len(related), int(n_bids * 0.8))
+        chosen = set(rng.choice(related, size=n_related, replace=False).tolist())
+        while len(chosen) < n_bids:
+            chosen.add(int(rng.integers(n_papers)))
+        for i in sorted(chosen):
+            bid_rows.append((r, paper_ids[i], "yes" if rng.random() < 0.6 else "maybe"))
+    bid_df = pd.DataFrame(bid_rows, columns=["rid", "pid", "pref"])
+
+    # authors: the countries of a paper's authors are mostly that of the first author
+    reviewer_countries = rng.choice(COUNTRIES, size=n_reviewers, p=country_weights)
+    author_counts = rng.integers(1, 7, size=n_papers)
+    first_countries = rng.choice(COUNTRIES, size=n_papers, p=country_weights)
+    author_countries = [c if rng.random() < 0.8 else rng.choice(COUNTRIES, p=country_weights)
+                        for c, n in zip(first_countries, author_counts) for _ in range(n)]
+    author_pids = np.repeat(paper_ids, author_counts)
+    author_df = pd.DataFrame({
+        "submission #": author_pids,
+        "first name": "Author",
+        "last name": [f"{i + 1}" for i in range(len(author_pids))],
+        "email": [f"author{i + 1}@example.org" for i in range(len(author_pids))],
+        "country": author_countries,
+        "affiliation": "University",
+        "Web page": np.nan,
+        "person #": np.arange(n_reviewers + 1, n_reviewers + 1 + len(author_pids)),
+        "corresponding?": ""})
+
+    # declared conflicts between random pairs
+    n_conflicts = n_papers // 2
+    conflict_df = pd.DataFrame({
+        "rid": rng.choice(reviewer_ids, size=n_conflicts),
+        "pid": rng.choice(paper_ids, size=n_conflicts)}).drop_duplicates()
+    conflict_df = conflict_df.sort_values(["rid", "pid"])
+
+    submission_df = pd.DataFrame({
+        "#": paper_ids,
+        "track #": 1,
+        "track name": "full",
+        "title": [f"Paper {p}" for p in paper_ids],
+        "authors": "",
+        "submitted": "2023-01-01 00:00",
+        "last updated": "2023-01-01 00:00",
+        "form fields": np.nan,
+        "keywords": np.nan,
+        "decision": np.nan,
+        "notified": np.nan,
+        "reviews sent": np.nan,
+        "abstract": ""})
+    pc_df = pd.DataFrame({
+        "#": reviewer_ids,
+        "person #": reviewer_ids,
+        "first name": "Reviewer",
+        "last name": [f"{r}" for r in reviewer_ids],
+        "email": emails,
+        "country": reviewer_countries,
+        "affiliation": "University",
+        "Web page": np.nan,
+        "role": "PC member",
+        "track #": 1,
+        "track name": "full"})
+    reviewer_df = pd.DataFrame({
+        "id": reviewer_ids,
+        "name": [f"Reviewer {r}" for r in reviewer_ids],
+        "email": emails,
+        "role": "pc"})
+    # some reviewers ask for fewer papers than the default
+    pc_list_df = pc_df.copy()
+    pc_list_df["max"] = np.where(rng.random(n_reviewers) < max_ratio,
+                                 rng.integers(1, 4, size=n_reviewers), np.nan)
+
+    return {
+        "submissions": submission_df,
+        "program_committee": pc_df,
+        "authors": author_df,
+        "pc_list": pc_list_df,
+        "reviewer": reviewer_df,
+        "bid": bid_df,
+        "conflict": conflict_df,
+        "reviewer_topic": reviewer_topic_df,
+        "submission_topic": submission_topic_df,
+    }
+
+
+def write(data, output_dirpath):
+    os.makedirs(output_dirpath, exist_ok=True)
+    with pd.ExcelWriter(os.path.join(output_dirpath, "easychair.xlsx"), engine="openpyxl") as writer:
+        data["program_committee"].to_excel(writer, sheet_name="Program committee", index=False)
+        data["submissions"].to_excel(writer, sheet_name="Submissions", index=False)
+        data["authors"].to_excel(writer, sheet_name="Authors", index=False)
+    data["pc_list"].to_excel(os.path.join(output_dirpath, "pc.xlsx"), sheet_name="PC", index=False)
+    for name in ["reviewer", "bid", "conflict", "reviewer_topic", "submission_topic"]:
+        data[name].to_csv(os.path.join(output_dirpath, f"{name}.csv"), header=False, index=False)
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description="This script generates synthetic EasyChair files "
+                            "(easychair.xlsx, reviewer.csv, bid.csv, conflict.csv, reviewer_topic.csv "
+                            "and submission_topic.csv) and a PC list (pc.xlsx) for testing and benchmarking.")
+    parser.add_argument("output_dirpath", help="Directory where the files are written.")
+    parser.add_argument("--papers", type=int, default=1000,
+                        help="Number of submissions.")
+    parser.add_argument("--reviewers", type=int, default=None,
+                        help="Number of PC members (default: 60%% of the papers).")
+    parser.add_argument("--topics", type=int, default=50,
+                        help="Number of topics.")
+    parser.add_argument("--bids", type=int, default=25,
+                        help="Average number of bids per reviewer.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed.")
+    args = parser.parse_args()
+
+    reviewers = args.reviewers or max(1, args.papers * 3 // 5)
+    data = generate(args.papers, reviewers, args.topics, args.bids, seed=args.seed)
+    write(data, args.output_dirpath)
+    print(f"{args.papers} papers, {reviewers} reviewers, {len(data['bid'])} bids, "
+          f"{len(data['conflict'])} conflicts, {len(data['authors'])} authors")
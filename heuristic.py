@@ -0,0 +1,241 @@
+import time
+import numpy as np
+
+
+class AssignmentState:
+    # a (partial) assignment over reviewer/paper indices with the counters every constraint needs
+
+    def __init__(self, score_matrix, mask, coi_mask, no_bid_mask, mins, maxs, no_bid_caps,
+                 assign_num, country_coi_max):
+        self.scores = score_matrix
+        self.mask = mask
+        self.coi = coi_mask
+        self.no_bid = no_bid_mask
+        self.mins = list(mins)
+        self.maxs = list(maxs)
+        self.no_bid_caps = list(no_bid_caps)
+        self.assign_num = assign_num
+        self.country_coi_max = country_coi_max
+        n_reviewers, n_papers = score_matrix.shape
+        self.rev_papers = [set() for _ in range(n_reviewers)]
+        self.paper_revs = [set() for _ in range(n_papers)]
+        self.paper_coi = [0] * n_papers
+        self.rev_no_bid = [0] * n_reviewers
+        self.objective = 0
+
+    def can_add(self, r, p):
+        return (self.mask[r, p]
+                and r not in self.paper_revs[p]
+                and len(self.paper_revs[p]) < self.assign_num
+                and len(self.rev_papers[r]) < self.maxs[r]
+                and (not self.coi[r, p] or self.paper_coi[p] < self.country_coi_max)
+                and (not self.no_bid[r, p] or self.rev_no_bid[r] < self.no_bid_caps[r]))
+
+    def add(self, r, p):
+        self.rev_papers[r].add(p)
+        self.paper_revs[p].add(r)
+        self.paper_coi[p] += int(self.coi[r, p])
+        self.rev_no_bid[r] += int(self.no_bid[r, p])
+        self.objective += int(self.scores[r, p])
+
+    def remove(self, r, p):
+        self.rev_papers[r].discard(p)
+        self.paper_revs[p].discard(r)
+        self.paper_coi[p] -= int(self.coi[r, p])
+        self.rev_no_bid[r] -= int(self.no_bid[r, p])
+        self.objective -= int(self.scores[r, p])
+
+    def pairs(self):
+        return [(r, p) for r, papers in enumerate(self.rev_papers) for p in papers]
+
+    def is_complete(self):
+        return (all(len(revs) == self.assign_num for revs in self.paper_revs)
+                and all(len(papers) >= self.mins[r] for r, papers in enumerate(self.rev_papers)))
+
+
+def greedy_fill(state):
+    rows, cols = np.nonzero(state.mask)
+    order = np.argsort(-state.scores[rows, cols], kind="stable")
+    remaining = sum(state.assign_num - len(revs) for revs in state.paper_revs)
+    for r, p in zip(rows[order].tolist(), cols[order].tolist()):
+        if remaining == 0:
+            break
+        if state.can_add(r, p):
+            state.add(r, p)
+            remaining -= 1
+
+
+def ranked_reviewers(state):
+    # candidate reviewers of each paper, best score first; only the candidates are ranked
+    pidx, ridx = np.nonzero(state.mask.T)
+    scores = state.scores[ridx, pidx].astype(np.int64)
+    # lexsort is stable, so tied reviewers keep their order
+    ridx = ridx[np.lexsort((-scores, pidx))]
+    counts = np.bincount(pidx, minlength=state.mask.shape[1])
+    return [rows.tolist() for rows in np.split(ridx, np.cumsum(counts)[:-1])]
+
+
+def fill_papers(state, ranked):
+    # papers the greedy pass left short: take a reviewer at full load by moving one of
+    # their papers to a reviewer with spare capacity
+    for p, revs in enumerate(state.paper_revs):
+        for r in ranked[p]:
+            if len(revs) >= state.assign_num:
+                break
+            if r in revs or len(state.rev_papers[r]) < state.maxs[r]:
+                if state.can_add(r, p):
+                    state.add(r, p)
+                continue
+            for q in list(state.rev_papers[r]):
+                state.remove(r, q)
+                if state.can_add(r, p):
+                    state.add(r, p)
+                    r2 = next((r2 for r2 in ranked[q] if state.can_add(r2, q)), None)
+                    if r2 is not None:
+                        state.add(r2, q)
+                        break
+                    state.remove(r, p)
+                state.add(r, q)
+
+
+def fill_reviewers(state):
+    # reviewers below their lower bound take over papers from reviewers above theirs
+    for r, papers in enumerate(state.rev_papers):
+        if len(papers) >= state.mins[r]:
+            continue
+        for p in np.argsort(-state.scores[r], kind="stable").tolist():
+            if len(papers) >= state.mins[r]:
+                break
+            if not state.mask[r, p] or p in papers:
+                continue
+            for r2 in sorted(state.paper_revs[p], key=lambda r2: state.scores[r2, p]):
+                if len(state.rev_papers[r2]) <= state.mins[r2]:
+                    continue
+                state.remove(r2, p)
+                if state.can_add(r, p):
+                    state.add(r, p)
+                    break
+                state.add(r2, p)
+
+
+def improve_by_replacement(state, ranked, deadline):
+    # replace a reviewer of a paper by a better-scoring one with spare capacity
+    improved = False
+    for p, revs in enumerate(state.paper_revs):
+        if time.time() > deadline:
+            break
+        for r in sorted(revs, key=lambda r: state.scores[r, p]):
+            if len(state.rev_papers[r]) <= state.mins[r]:
+                continue
+            state.remove(r, p)
+            replacement = None
+            for r2 in ranked[p]:
+                if state.scores[r2, p] <= state.scores[r, p]:
+                    break
+                if r2 != r and state.can_add(r2, p):
+                    replacement = r2
+                    break
+            if replacement is None:
+                state.add(r, p)
+            else:
+                state.add(replacement, p)
+                improved = True
+    return improved
+
+
+def improve_by_swap(state, ranked, deadline):
+    # (r1, p1), (r2, p2) -> (r1, p2), (r2, p1); the loads of both reviewers stay the same
+    improved = False
+    scores = state.scores
+    for r1, p1 in state.pairs():
+        if time.time() > deadline:
+            break
+        if p1 not in state.rev_papers[r1]:
+            continue
+        for r2 in ranked[p1]:
+            if scores[r2, p1] <= scores[r1, p1]:
+                break
+            if r2 in state.paper_revs[p1]:
+                continue
+            for p2 in list(state.rev_papers[r2]):
+                if (r1 in state.paper_revs[p2] or not state.mask[r1, p2]
+                        or scores[r1, p2] + scores[r2, p1] <= scores[r1, p1] + scores[r2, p2]):
+                    continue
+                state.remove(r1, p1)
+                state.remove(r2, p2)
+                if state.can_add(r1, p2):
+                    state.add(r1, p2)
+                    if state.can_add(r2, p1):
+                        state.add(r2, p1)
+                        improved = True
+                        break
+                    state.remove(r1, p2)
+                state.add(r1, p1)
+                state.add(r2, p2)
+            if improved and p1 not in state.rev_papers[r1]:
+                break
+    return improved
+
+
+def improve_by_ejection(state, ranked, deadline):
+    # (r, p), (r2, q) -> (r2, p), (r3, q): a better reviewer r2 at full load takes over p
+    # and hands one of their papers q to a reviewer r3 with spare capacity
+    improved = False
+    scores = state.scores
+    for r, p in state.pairs():
+        if time.time() > deadline:
+            break
+        if p not in state.rev_papers[r] or len(state.rev_papers[r]) <= state.mins[r]:
+            continue
+        for r2 in ranked[p]:
+            gain = scores[r2, p] - scores[r, p]
+            if gain <= 0:
+                break
+            if r2 in state.paper_revs[p] or len(state.rev_papers[r2]) < state.maxs[r2]:
+                continue
+            state.remove(r, p)
+            moved = False
+            for q in list(state.rev_papers[r2]):
+                state.remove(r2, q)
+                if state.can_add(r2, p):
+                    state.add(r2, p)
+                    for r3 in ranked[q]:
+                        if scores[r3, q] - scores[r2, q] + gain <= 0:
+                            break
+                        if state.can_add(r3, q):
+                            state.add(r3, q)
+                            moved = True
+                            break
+                    if moved:
+                        break
+                    state.remove(r2, p)
+                state.add(r2, q)
+            if moved:
+                improved = True
+                break
+            state.add(r, p)
+    return improved
+
+
+def heuristic_assignment(score_matrix, mask, coi_mask, no_bid_mask, mins, maxs, no_bid_caps,
+                         assign_num, country_coi_max, time_limit=60, initial_pairs=None):
+    state = AssignmentState(score_matrix, mask, coi_mask, no_bid_mask, mins, maxs, no_bid_caps,
+                            assign_num, country_coi_max)
+    for r, p in initial_pairs or []:
+        if state.can_add(r, p):
+            state.add(r, p)
+    greedy_fill(state)
+    ranked = ranked_reviewers(state)
+    fill_papers(state, ranked)
+    fill_reviewers(state)
+    print("Greedy objective:", state.objective)
+
+    deadline = time.time() + time_limit
+    while time.time() < deadline:
+        improved = improve_by_replacement(state, ranked, deadline)
+        improved = improve_by_swap(state, ranked, deadline) or improved
+        improved = improve_by_ejection(state, ranked, deadline) or improved
+        if not improved:
+            break
+    print("Local search objective:", state.objective)
+    return state
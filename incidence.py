@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+def incidence(ids, values, value_index, row_index=None):
+    # identifier x value (e.g., topic or country) 0/1 matrix. The rows follow row_index if
+    # given (identifiers not in it are dropped), or else the first appearance of each identifier.
+    ids = np.asarray(ids)
+    col_codes = value_index.get_indexer(values)
+    if row_index is None:
+        row_codes, identifiers = pd.factorize(ids)
+    else:
+        row_codes, identifiers = row_index.get_indexer(ids), row_index
+        col_codes = col_codes[row_codes >= 0]
+        row_codes = row_codes[row_codes >= 0]
+    data = np.ones(len(row_codes), dtype=np.int32)
+    matrix = sp.csr_matrix((data, (row_codes, col_codes)),
+                           shape=(len(identifiers), len(value_index)))
+    return matrix, np.asarray(identifiers, dtype=np.int64)
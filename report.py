@@ -0,0 +1,163 @@
+import contextlib
+import json
+import os
+import sys
+import time
+import mip
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Everything a run measures is collected here, like the parsed tables in easychair.py,
+# so that the solver code only has to call these functions; write() dumps it.
+_report = {}
+
+
+def reset():
+    _report.clear()
+    _report.update({"phases": [], "models": [], "progress": [], "start": time.time()})
+
+
+reset()
+
+
+def rusage_mb(who):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * unit / 2 ** 20
+
+
+# resetting the peak of a phase (reset_hwm) also resets ru_maxrss on Linux, so the peak of the
+# whole run is kept here
+_max_rss = [0.0]
+
+
+def peak_rss_mb():
+    # peak resident set size of this process and of its finished children (e.g., --jobs workers)
+    # over the whole run so far
+    if resource is None:
+        return None
+    _max_rss[0] = max(_max_rss[0], rusage_mb(resource.RUSAGE_SELF),
+                      rusage_mb(resource.RUSAGE_CHILDREN))
+    return round(_max_rss[0], 1)
+
+
+def reset_hwm():
+    # Linux (4.0+) lets a process reset its peak RSS (VmHWM) to the current RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def hwm_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+# the peaks of the phases that are running, innermost last
+_phase_peaks = []
+
+
+@contextlib.contextmanager
+def phase(name):
+    # peak_rss_mb is the peak of this phase alone (and of the workers that finished in it),
+    # where the peak can be reset; max_rss_so_far_mb is that of the run up to its end
+    start = time.time()
+    peak_rss_mb()
+    if _phase_peaks:
+        # the enclosing phase keeps what it reached before this one resets the peak
+        _phase_peaks[-1] = max(_phase_peaks[-1], hwm_mb())
+    resettable = reset_hwm()
+    children = rusage_mb(resource.RUSAGE_CHILDREN) if resource is not None else 0.0
+    _phase_peaks.append(0.0)
+    yield
+    peak = _phase_peaks.pop()
+    if resettable:
+        peak = max(peak, hwm_mb())
+        if _phase_peaks:
+            _phase_peaks[-1] = max(_phase_peaks[-1], peak)
+        if resource is not None and rusage_mb(resource.RUSAGE_CHILDREN) > children:
+            peak = max(peak, rusage_mb(resource.RUSAGE_CHILDREN))
+    _report["phases"].append({
+        "phase": name,
+        "start": round(start - _report["start"], 3),
+        "seconds": round(time.time() - start, 3),
+        "peak_rss_mb": round(peak, 1) if resettable else None,
+        "max_rss_so_far_mb": peak_rss_mb(),
+    })
+
+
+def record_model(name, m):
+    _report["models"].append({
+        "model": name,
+        "variables": m.num_cols,
+        "constraints": m.num_rows,
+        "nonzeros": m.num_nz,
+    })
+
+
+def maximization_bound(x, upper, final):
+    # CBC reports the bound of a maximization sometimes in the sense of the model and sometimes
+    # in that of its internal minimization of the negated objective. The bound only decreases,
+    # from the first one reported to the final one, so the sign that stays in between is kept.
+    tol = 1e-6 * max(1.0, abs(final or 0.0))
+
+    def fits(b):
+        return (upper is None or b <= upper + tol) and (final is None or b >= final - tol)
+
+    return x if fits(x) or not fits(-x) else -x
+
+
+def record_progress(name, m, seconds):
+    # CBC's progress log holds (seconds, (bound, incumbent))
+    def value(x):
+        return None if x is None or abs(x) >= 1e300 else x
+
+    final_bound = value(m.objective_bound)
+    points = []
+    upper = None
+    for t, (lb, ub) in m.search_progress_log.log:
+        bound = value(lb)
+        if m.sense == mip.MAXIMIZE and bound is not None:
+            bound = upper = maximization_bound(bound, upper, final_bound)
+        points.append((t, bound, value(ub)))
+    points.append((seconds, final_bound, value(m.objective_value)))
+    for t, bound, incumbent in points:
+        gap = None
+        if bound is not None and incumbent:
+            gap = round(abs(bound - incumbent) / abs(incumbent), 6)
+        _report["progress"].append({
+            "model": name,
+            "seconds": round(t, 3),
+            "incumbent": incumbent,
+            "bound": bound,
+            "gap": gap,
+        })
+
+
+def set_value(key, value):
+    _report[key] = value
+
+
+def write(filepath):
+    # the full report as JSON, and the incumbent/bound time series as CSV next to it
+    report = {key: value for key, value in _report.items() if key != "start"}
+    report["total_seconds"] = round(time.time() - _report["start"], 3)
+    report["peak_rss_mb"] = peak_rss_mb()
+    with open(filepath, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    progress_filepath = os.path.splitext(filepath)[0] + ".progress.csv"
+    pd.DataFrame(report["progress"], columns=["model", "seconds", "incumbent", "bound", "gap"]) \
+        .to_csv(progress_filepath, index=False)
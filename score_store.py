@@ -0,0 +1,146 @@
+import os
+import numpy as np
+import pandas as pd
+
+SCORE_DTYPE = np.dtype([("rid", np.int32), ("pid", np.int32), ("score", np.int32)])
+SCORE_FILENAMES = ["score.npy", "score.xlsx"]
+EXCEL_MAX_ROWS = 1048576
+
+
+def find_score_filepath(input_dirpath):
+    # score.npy whenever it exists; score.xlsx is an export for browsing, read only when
+    # there is no score.npy (e.g., scores computed by an older version)
+    for filename in SCORE_FILENAMES:
+        filepath = os.path.join(input_dirpath, filename)
+        if os.path.exists(filepath):
+            return filepath
+    raise FileNotFoundError(f"No score file ({' or '.join(SCORE_FILENAMES)}) in {input_dirpath}. "
+                            "Run compute_score.py first.")
+
+
+class ScoreStore:
+    # nonzero scores kept as one (rid, pid, score) int32 record array sorted by (rid, pid);
+    # a reviewer's scores are a contiguous slice, and a pair is found by binary search in it.
+
+    def __init__(self, table):
+        self.table = table
+        self.rids = table["rid"]
+        self.pids = table["pid"]
+        self.values = table["score"]
+        bounds = np.flatnonzero(np.diff(self.rids)) + 1
+        starts = np.concatenate([[0], bounds]) if len(table) else np.zeros(0, dtype=np.int64)
+        self.starts = np.append(starts, len(table)).astype(np.int64)
+        self.reviewers = np.asarray(self.rids[starts], dtype=np.int64)
+        self.row_index = {int(r): i for i, r in enumerate(self.reviewers)}
+
+    @classmethod
+    def from_frame(cls, df):
+        df = df.groupby(["rid", "pid"])["score"].sum().reset_index()
+        table = np.empty(len(df), dtype=SCORE_DTYPE)
+        for name in SCORE_DTYPE.names:
+            table[name] = df[name].to_numpy()
+        return cls(table)
+
+    @classmethod
+    def load(cls, filepath):
+        if filepath.endswith(".npy"):
+            # memory-mapped: the columns are views on the file, nothing is parsed or copied
+            table = np.load(filepath, mmap_mode="r")
+            if table.dtype != SCORE_DTYPE:
+                raise ValueError(f"{filepath} is not a score file (dtype {table.dtype})")
+            return cls(table)
+        score_df = pd.read_excel(filepath, engine='openpyxl')
+        return cls.from_frame(score_df)
+
+    def save(self, filepath):
+        np.save(filepath, np.ascontiguousarray(self.table))
+
+    def __len__(self):
+        return len(self.table)
+
+    def row(self, rid):
+        i = self.row_index.get(int(rid))
+        if i is None:
+            return self.pids[:0], self.values[:0]
+        start, end = self.starts[i], self.starts[i + 1]
+        return self.pids[start:end], self.values[start:end]
+
+    def locate(self, rids, pids):
+        # position of each (rid, pid) in the table, -1 where the pair is not stored
+        rids = np.asarray(rids, dtype=np.int64)
+        pids = np.asarray(pids, dtype=np.int64)
+        result = np.full(len(rids), -1, dtype=np.int64)
+        if len(rids) == 0:
+            return result
+        order = np.argsort(rids, kind="stable")
+        sorted_rids = rids[order]
+        bounds = np.flatnonzero(np.diff(sorted_rids)) + 1
+        for group in np.split(order, bounds):
+            i = self.row_index.get(int(rids[group[0]]))
+            if i is None:
+                continue
+            start, end = self.starts[i], self.starts[i + 1]
+            row_pids = self.pids[start:end]
+            queries = pids[group]
+            j = np.minimum(np.searchsorted(row_pids, queries), len(row_pids) - 1)
+            found = row_pids[j] == queries
+            result[group[found]] = start + j[found]
+        return result
+
+    def lookup(self, rids, pids):
+        positions = self.locate(rids, pids)
+        result = np.zeros(len(positions), dtype=np.int64)
+        found = positions >= 0
+        result[found] = self.values[positions[found]]
+        return result
+
+    def dense(self, reviewer_ids, paper_ids):
+        # reviewer x paper score matrix restricted to the given ids (missing pairs are 0)
+        matrix = np.zeros((len(reviewer_ids), len(paper_ids)), dtype=np.int32)
+        paper_index = pd.Index(paper_ids)
+        for i, rid in enumerate(reviewer_ids):
+            pids, values = self.row(rid)
+            cols = paper_index.get_indexer(pids)
+            found = cols >= 0
+            matrix[i, cols[found]] = values[found]
+        return matrix
+
+    def count_at_least(self, threshold):
+        # number of papers with score >= threshold for every reviewer in the store
+        if len(self.table) == 0:
+            return {}
+        counts = np.add.reduceat((self.values >= threshold).astype(np.int64), self.starts[:-1])
+        return {int(r): int(c) for r, c in zip(self.reviewers, counts)}
+
+    def papers_at_least(self, rid, threshold):
+        pids, values = self.row(rid)
+        return set(pids[values >= threshold].tolist())
+
+
+def patch_score_file(filepath, rids, pids, scores):
+    # Pairs already in the file are overwritten in place through a writable memory map
+    # (a score that drops to 0 stays as a 0 record). New pairs are merged in, which
+    # rewrites the file. Returns the numbers of updated and inserted pairs.
+    rids = np.asarray(rids, dtype=np.int64)
+    pids = np.asarray(pids, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.int64)
+    table = np.load(filepath, mmap_mode="r+")
+    if table.dtype != SCORE_DTYPE:
+        raise ValueError(f"{filepath} is not a score file (dtype {table.dtype})")
+    positions = ScoreStore(table).locate(rids, pids)
+    found = positions >= 0
+    if found.any():
+        table["score"][positions[found]] = scores[found]
+        table.flush()
+
+    new = ~found & (scores != 0)
+    if new.any():
+        added = np.empty(int(new.sum()), dtype=SCORE_DTYPE)
+        added["rid"], added["pid"], added["score"] = rids[new], pids[new], scores[new]
+        merged = np.concatenate([np.asarray(table), added])
+        del table
+        merged = merged[np.lexsort((merged["pid"], merged["rid"]))]
+        tmp_filepath = filepath + ".tmp.npy"
+        np.save(tmp_filepath, merged)
+        os.replace(tmp_filepath, filepath)
+    return int(found.sum()), int(new.sum())
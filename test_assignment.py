@@ -1,18 +1,215 @@
+import importlib.util
 import os
 import pandas as pd
 import numpy as np
+import openpyxl
+import easychair
+from country import country_coi_pairs
 from pprint import pprint
-from collections import defaultdict
 
 PREFS = ["yes", "maybe", "no"]
 
+
+def load_data(input_dirpath, pc_filepath):
+    # the EasyChair tables are memoized by easychair.py, so this is cheap right after assign.py
+    pc_num = len(easychair.read_pc_list(pc_filepath))
+    pc_df = easychair.read_pc_members(pc_filepath, input_dirpath)
+    assert pc_num == len(pc_df)
+    return {
+        "paper_df": easychair.read_submissions(input_dirpath),
+        "author_df": easychair.read_authors(input_dirpath),
+        "pc_df": pc_df,
+        "coi_df": easychair.read_conflicts(input_dirpath),
+        "bid_df": easychair.read_bids(input_dirpath),
+        "paper_topic_df": easychair.read_submission_topics(input_dirpath),
+        "rev_topic_df": easychair.read_reviewer_topics(input_dirpath),
+    }
+
+
+def read_assignment(filepath):
+    assign_df = pd.read_csv(filepath, header=None)
+    assign_df.columns = ["rid", "pid"]
+    return assign_df
+
+
+def joined(df, key, column):
+    # key -> the distinct values of the column joined by "/", in order of appearance
+    df = df[[key, column]].dropna().drop_duplicates()
+    return df.groupby(key, sort=False)[column].agg(lambda values: "/".join(map(str, values)))
+
+
+def histogram(counts, name):
+    return [[name.format(num), int(size)]
+            for num, size in counts.value_counts().sort_index().items()]
+
+
+def widen(pairs, key, fields, width):
+    # one row per key with the fields of its i-th pair in the columns [name]_i
+    pairs = pairs.assign(position=pairs.groupby(key, sort=False).cumcount())
+    wide = pairs.set_index([key, "position"])[list(fields)].unstack("position")
+    width = max(width, pairs["position"].max() + 1 if len(pairs) else 0)
+    wide = wide.reindex(columns=pd.MultiIndex.from_product([list(fields), range(width)]))
+    wide.columns = [f"{fields[field]}_{i}" for field, i in wide.columns]
+    return wide.astype(object).where(wide.notna(), "")
+
+
+def validate(data, assign_df, assign_num, default_max, country_coi_max):
+    # returns the Stats, Papers and Reviewers sheets of the report
+    paper_df, pc_df = data["paper_df"], data["pc_df"]
+    paper_ids = paper_df["#"].astype(int)
+    reviewer_ids = pc_df["id"].astype(int)
+    pc_df = pc_df.set_index("id")
+    paper_df = paper_df.set_index("#")
+    assign_df = assign_df[["rid", "pid"]].astype("int64")
+    result_stat = []
+
+    assert set(assign_df["rid"]).issubset(set(reviewer_ids))
+    result_stat.append(["# of reviewers", reviewer_ids.nunique()])
+    assert set(assign_df["pid"]) == set(paper_ids)
+    result_stat.append(["# of papers", paper_ids.nunique()])
+
+    # constraints
+    loads = assign_df.groupby("rid", sort=False).size()
+    max_nums = pc_df["max"].reindex(loads.index).fillna(default_max)
+    violated = loads.index[loads > max_nums]
+    for r in violated:
+        print("Upper bound violation:", r)
+    result_stat.append(["# of upper bound violation", len(violated)])
+
+    coi_df = data["coi_df"]
+    assert coi_df["pid"].isin(assign_df["pid"]).all()
+    violated = assign_df.merge(coi_df[["rid", "pid"]].drop_duplicates(), on=["rid", "pid"])
+    for rid, pid in violated.itertuples(index=False):
+        print("COI violation: ", rid, pid)
+    result_stat.append(["# of COI violation", len(violated)])
+
+    coi_rids, coi_pids = country_coi_pairs(pc_df.reset_index(), data["author_df"])
+    country_coi_df = pd.DataFrame({"rid": coi_rids, "pid": coi_pids, "country_coi": True})
+    country_coi_nums = assign_df.merge(country_coi_df, on=["rid", "pid"]).groupby("pid").size()
+    violated = country_coi_nums[country_coi_nums > country_coi_max]
+    for p in violated.index:
+        print("Country COI violation:", p)
+    result_stat.append(["# of country COI violation", len(violated)])
+
+    # statistics; bids of PC members only, the last one of a pair counts
+    bid_df = data["bid_df"]
+    bid_df = bid_df[bid_df["rid"].isin(reviewer_ids)].drop_duplicates(["rid", "pid"], keep="last")
+    bid_df = bid_df.merge(country_coi_df, on=["rid", "pid"], how="left")
+    bid_df["valid"] = bid_df["country_coi"].isna()
+    pairs = assign_df.merge(bid_df[["rid", "pid", "pref"]], on=["rid", "pid"], how="left")
+    pairs["bid"] = pairs["pref"].notna()
+    pairs["pref"] = pairs["pref"].fillna("no")
+
+    result_stat += histogram(loads, "# of reviewers with {} papers")
+    paper_bids = pairs.groupby("pid", sort=False)["bid"].sum()
+    result_stat += histogram(paper_bids, "# of papers with {} willing reviewers")
+    rev_bids = pairs.groupby("rid", sort=False)["bid"].sum()
+    result_stat += histogram(rev_bids, "# of reviewers with {} bidded paper")
+
+    pprint(result_stat)
+    result_stat_df = pd.DataFrame(result_stat, columns=["Name", "Value"])
+
+    paper_countries = joined(data["author_df"], "submission #", "country")
+    paper_topics = joined(data["paper_topic_df"], "id", "topic")
+    rev_topics = joined(data["rev_topic_df"], "id", "topic")
+    pairs["country"] = pairs["rid"].map(pc_df["country"])
+    pairs["rev_topics"] = pairs["rid"].map(rev_topics).fillna("")
+    pairs["paper_countries"] = pairs["pid"].map(paper_countries).fillna("")
+    pairs["paper_topics"] = pairs["pid"].map(paper_topics).fillna("")
+    last_minute = pc_df["last"] == 1 if "last" in pc_df.columns else pd.Series(False, pc_df.index)
+    pairs["last"] = pairs["rid"].map(last_minute).fillna(False).astype(bool)
+
+    # Papers sheet, in order of appearance in the assignment
+    by_paper = pairs.groupby("pid", sort=False)
+    pids = pd.Index(by_paper.size().index)
+    bids = bid_df.groupby("pid")
+    result_paper_df = pd.DataFrame({
+        "Paper ID": pids,
+        "Title": paper_df["title"].reindex(pids).values,
+        "Authors": paper_df["authors"].reindex(pids).values,
+        "Countries": paper_countries.reindex(pids).fillna("").values,
+        "Topics": paper_topics.reindex(pids).fillna("").values,
+        "# of bids": bids.size().reindex(pids, fill_value=0).values,
+        "# of valid bids": bids["valid"].sum().reindex(pids, fill_value=0).astype(int).values,
+        "# of last minute reviewers": by_paper["last"].sum().astype(int).values,
+        "Most freq. countries": pairs.groupby(["pid", "country"], sort=False).size()
+                                     .groupby(level=0).max().reindex(pids, fill_value=1).values,
+    })
+    pref_dist = pd.crosstab(pairs["pid"], pairs["pref"]).reindex(index=pids, columns=PREFS,
+                                                                fill_value=0)
+    wide = widen(pairs, "pid", {"rid": "Reviewer", "pref": "Bid", "country": "Country",
+                                "rev_topics": "Topics"}, assign_num)
+    result_paper_df = pd.concat([result_paper_df, pref_dist.reset_index(drop=True),
+                                 wide.reindex(pids).reset_index(drop=True)], axis=1)
+
+    # Reviewers sheet
+    rids = pd.Index(loads.index)
+    bids = bid_df.groupby("rid")
+    result_rev_df = pd.DataFrame({
+        "Reviewer ID": rids,
+        "Name": pc_df["name"].reindex(rids).values,
+        "Email": pc_df["email"].reindex(rids).values,
+        "Country": pc_df["country"].reindex(rids).values,
+        "Topics": rev_topics.reindex(rids).fillna("").values,
+        "# of bids": bids.size().reindex(rids, fill_value=0).values,
+        "# of valid bids": bids["valid"].sum().reindex(rids, fill_value=0).astype(int).values,
+    })
+    pref_dist = pd.crosstab(pairs["rid"], pairs["pref"]).reindex(index=rids, columns=PREFS,
+                                                                fill_value=0)
+    wide = widen(pairs, "rid", {"pid": "Paper", "pref": "Bid", "paper_countries": "Countries",
+                                "paper_topics": "Topics"}, default_max)
+    result_rev_df = pd.concat([result_rev_df, pref_dist.reset_index(drop=True),
+                               wide.reindex(rids).reset_index(drop=True)], axis=1)
+
+    return result_stat_df, result_paper_df, result_rev_df
+
+
+def cell(value):
+    if isinstance(value, (float, np.floating)) and np.isnan(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def missing_engine(filepath):
+    # parquet is optional: pandas writes it with pyarrow (or fastparquet), if installed
+    if os.path.splitext(filepath)[1] != ".parquet":
+        return False
+    return not any(importlib.util.find_spec(name) for name in ["pyarrow", "fastparquet"])
+
+
+def write_report(filepath, result_stat_df, result_paper_df, result_rev_df):
+    # .xlsx: one workbook streamed row by row; .csv/.parquet: one file per sheet
+    sheets = [("Stats", result_stat_df), ("Papers", result_paper_df), ("Reviewers", result_rev_df)]
+    stem, ext = os.path.splitext(filepath)
+    if ext == ".csv":
+        for name, df in sheets:
+            df.to_csv(f"{stem}.{name.lower()}.csv", index=False)
+    elif ext == ".parquet":
+        for name, df in sheets:
+            # the padded columns mix numbers and "", which parquet columns cannot
+            df = df.astype({c: str for c in df.columns if df[c].dtype == object})
+            df.to_parquet(f"{stem}.{name.lower()}.parquet", index=False)
+    else:
+        wb = openpyxl.Workbook(write_only=True)
+        for name, df in sheets:
+            ws = wb.create_sheet(name)
+            ws.append(list(df.columns))
+            for row in df.itertuples(index=False):
+                ws.append([cell(value) for value in row])
+        wb.save(filepath)
+
+
 def main():
     from argparse import ArgumentParser
     parser = ArgumentParser(description="This script outputs the assignment statistics.")
     parser.add_argument("input_dirpath", help="Directory where files from EasyChair are located.")
     parser.add_argument("pc_filepath", help="Excel file containing PC or SPC members.")
     parser.add_argument("input_filepath", help="CSV file output by assing.py")
-    parser.add_argument("output_filepath", help="Excel file including the assignment statistics.")
+    parser.add_argument("output_filepath", help="Excel file including the assignment statistics. "
+                        "With a .csv or .parquet extension, each sheet is written to "
+                        "[output].[sheet].csv or .parquet instead.")
     parser.add_argument("--assign_num", type=int, required=True,
                         help="Number of reviewers per paper.")
     parser.add_argument("--default_max", type=int, required=True,
@@ -22,196 +219,13 @@ def main():
                         "belong to the same country/region as the authors "
                         "of the paper.")
     args = parser.parse_args()
+    if missing_engine(args.output_filepath):
+        parser.error("writing .parquet files needs pyarrow (pip install pyarrow)")
 
-    result_stat = []
-
-    paper_filepath = os.path.join(args.input_dirpath, "easychair.xlsx")
-    paper_df = pd.read_excel(paper_filepath, "Submissions", engine='openpyxl')
-    author_df = pd.read_excel(paper_filepath, "Authors", engine='openpyxl')
-    paper_ids = paper_df["#"].astype(int).tolist()
-    paper_df.set_index("#", inplace=True)
-
-    pc_df = pd.read_excel(args.pc_filepath, engine='openpyxl')
-    pc_num = len(pc_df)
-    reviewer_filepath = os.path.join(args.input_dirpath, "reviewer.csv")
-    rev_df = pd.read_csv(reviewer_filepath, header=None)
-    rev_df.columns = ["id", "name", "email", "role"]
-    pc_df = pc_df.merge(rev_df, on="email")
-    assert pc_num == len(pc_df)
-    reviewer_ids = pc_df["id"].astype(int).tolist()
-    reviewer_ids_set = set(reviewer_ids)
-    pc_df.set_index("id", inplace=True)
-
-    assign_df = pd.read_csv(args.input_filepath, header=None)
-    assign_df.columns = ["rid", "pid"]
-    rev_papers = defaultdict(set)
-    paper_revs = defaultdict(set)
-    for idx, (rid, pid) in assign_df.iterrows():
-        rev_papers[rid].add(pid)
-        paper_revs[pid].add(rid)
-    
-    assert set(rev_papers).issubset(set(reviewer_ids))
-    result_stat.append(["# of reviewers", len(set(reviewer_ids))])
-    assert set(paper_revs) == set(paper_ids)
-    result_stat.append(["# of papers", len(set(paper_ids))])
-
-    violation = 0
-    for r, papers in rev_papers.items():
-        max_num = pc_df.at[r, "max"]
-        max_num = max_num if not np.isnan(max_num) else args.default_max
-        if not (len(papers) <= max_num):
-            violation += 1
-            print("Upper bound violation:", r)
-    result_stat.append(["# of upper bound violation", violation])
-
-    coi_filepath = os.path.join(args.input_dirpath, "conflict.csv")
-    coi_df = pd.read_csv(coi_filepath, header=None)
-    coi_df.columns = ["rid", "pid"]
-    violation = 0
-    for idx, (rid, pid) in coi_df.iterrows():
-        assert pid in paper_revs
-        if rid in rev_papers and pid in rev_papers[rid]:
-            violation += 1
-            print("COI violation: ", rid, pid)
-    result_stat.append(["# of COI violation", violation])
-
-    paper_countries = defaultdict(set)
-    for idx, (pid, country) in author_df[["submission #", "country"]].iterrows():
-        paper_countries[pid].add(country)
-
-    country_samples = set(pc_df["country"].tolist())
-    violation = 0
-    for p, reviewers in paper_revs.items():
-        countries = paper_countries[p]
-        country_coi_num = 0
-        for r in reviewers:
-            if pc_df.at[r, "country"] in countries:
-                country_coi_num += 1
-        if country_coi_num > args.country_coi_max:
-            violation += 1
-            print("Country COI violation:", rid, pid)
-    result_stat.append(["# of country COI violation", violation])
-
-    # statistics
-    bid_filepath = os.path.join(args.input_dirpath, "bid.csv")
-    bid_df = pd.read_csv(bid_filepath, header=None)
-    bid_df.columns = ["rid", "pid", "pref"]
-    bidding_rev = defaultdict(lambda: dict())
-    bidding_paper = defaultdict(lambda: dict())
-    for idx, (rid, pid, pref) in bid_df.iterrows():
-        if rid in reviewer_ids_set:
-            bidding_rev[rid][pid] = pref
-            bidding_paper[pid][rid] = pref
-
-    rev_num_sat = defaultdict(int)
-    for r, papers in rev_papers.items():
-        num = len(papers)
-        rev_num_sat[num] += 1
-    for num in sorted(rev_num_sat):
-        result_stat.append([f"# of reviewers with {num} papers", rev_num_sat[num]])
-    paper_sat = defaultdict(int)
-    for p, reviewers in paper_revs.items():
-        num = len(set(reviewers) & set(bidding_paper[p]))
-        paper_sat[num] += 1
-    for num in sorted(paper_sat):
-        result_stat.append([f"# of papers with {num} willing reviewers", paper_sat[num]])
-    rev_sat = defaultdict(int)
-    for r, papers in rev_papers.items():
-        num = len(set(papers) & set(bidding_rev[r]))
-        rev_sat[num] += 1
-    for num in sorted(rev_sat):
-        result_stat.append([f"# of reviewers with {num} bidded paper", rev_sat[num]])
-
-    pprint(result_stat)
-    result_stat_df = pd.DataFrame(result_stat, columns=["Name", "Value"])
-
-    last_minutes = set()
-    if "last" in pc_df.columns:
-        for rid in reviewer_ids:
-            if pc_df.at[rid, "last"] == 1:
-                last_minutes.add(rid)
-
-    def read_topics(df):
-        topics = defaultdict(set)
-        for idx, (identifier, topic) in df.iterrows():
-            topics[identifier].add(topic)
-        return topics
-    def range_str(string, num):
-        return [string.format(n) for n in range(num)]
-    paper_topic_filepath = os.path.join(args.input_dirpath, "submission_topic.csv")
-    paper_topic_df = pd.read_csv(paper_topic_filepath, header=None)
-    paper_topics = read_topics(paper_topic_df)
-    rev_topic_filepath = os.path.join(args.input_dirpath, "reviewer_topic.csv")
-    rev_topic_df = pd.read_csv(rev_topic_filepath, header=None)
-    rev_topics = read_topics(rev_topic_df)
-    result_papers = []
-    for p, reviewers in paper_revs.items():
-        reviewers = list(reviewers)
-        countries = "/".join(list(paper_countries[p]))
-        ts = "/".join(list(paper_topics[p]))
-        rev_pref = [bidding_rev[r][p] if p in bidding_rev[r] else "no"
-                    for r in reviewers]
-        pref_dist = [rev_pref.count(pref) for pref in PREFS]
-        num_bids = len(bidding_paper[p])
-        num_valid_bids = len([r for r in bidding_paper[p]
-                              if pc_df.at[r, "country"] not in paper_countries[p]])
-        num_last_minutes = len([r for r in reviewers if r in last_minutes])
-        rev_countries = [pc_df.at[r, "country"] for r in reviewers]
-        rev_country_count = max([rev_countries.count(c) for c in rev_countries])
-        rev_ts = ["/".join(list(rev_topics[r])) for r in reviewers]
-        result_papers.append([p, paper_df.at[p, "title"], paper_df.at[p, "authors"],
-                              countries, ts, num_bids, num_valid_bids, num_last_minutes,
-                              rev_country_count] 
-                             + pref_dist + reviewers
-                             + rev_pref + rev_countries + rev_ts)
-    result_paper_df = pd.DataFrame(result_papers, 
-                                   columns=["Paper ID", "Title", "Authors",
-                                            "Countries", "Topics", "# of bids",
-                                            "# of valid bids", "# of last minute reviewers",
-                                            "Most freq. countries"]
-                                   + PREFS
-                                   + range_str("Reviewer_{}", args.assign_num)
-                                   + range_str("Bid_{}", args.assign_num)
-                                   + range_str("Country_{}", args.assign_num)
-                                   + range_str("Topics_{}", args.assign_num))
-
-    def fill_list(l):
-        if len(l) >= args.default_max:
-            return l
-        return l + [""] * (args.default_max - len(l))
-    result_rev = []
-    for r, papers in rev_papers.items():
-        papers = list(papers)
-        ts = "/".join(list(rev_topics[r]))
-        country = pc_df.at[r, "country"]
-        num_bids = len(bidding_rev[r])
-        num_valid_bids = len([p for p in bidding_rev[r] 
-                              if country not in paper_countries[p]])
-        paper_prefs = fill_list([bidding_paper[p][r] if r in bidding_paper[p] else "no"
-                                for p in papers])
-        pref_dist = [paper_prefs.count(pref) for pref in PREFS]
-        paper_cs = fill_list(["/".join(list(paper_countries[p]))
-                                     for p in papers])
-        paper_ts = fill_list(["/".join(list(paper_topics[p]))
-                                  for p in papers])
-        result_rev.append([r, pc_df.at[r, "name"], pc_df.at[r, "email"],
-                           country, ts, num_bids, num_valid_bids]
-                          + pref_dist + fill_list(papers)
-                          + paper_prefs + paper_cs + paper_ts)
-    result_rev_df = pd.DataFrame(result_rev,
-                                 columns=["Reviewer ID", "Name", "Email",
-                                          "Country", "Topics", "# of bids",
-                                          "# of valid bids"]
-                                   + PREFS
-                                   + range_str("Paper_{}", args.default_max)
-                                   + range_str("Bid_{}", args.default_max)
-                                   + range_str("Countries_{}", args.default_max)
-                                   + range_str("Topics_{}", args.default_max))
-
-    with pd.ExcelWriter(args.output_filepath) as writer:
-        result_stat_df.to_excel(writer, index=None, sheet_name='Stats')
-        result_paper_df.to_excel(writer, index=None, sheet_name='Papers')
-        result_rev_df.to_excel(writer, index=None, sheet_name='Reviewers')
+    data = load_data(args.input_dirpath, args.pc_filepath)
+    assign_df = read_assignment(args.input_filepath)
+    result = validate(data, assign_df, args.assign_num, args.default_max, args.country_coi_max)
+    write_report(args.output_filepath, *result)
 
 
 if __name__ == '__main__':